@@ -9,6 +9,7 @@ st.set_page_config(layout="wide")
 st.title("Statistical Analysis")
 
 API_URL = f"{os.getenv('API_HOST')}/analysis_results/boxplot_stats"
+DISTRIBUTION_URL = f"{os.getenv('API_HOST')}/analysis_results/distribution"
 time_points = [0, 7, 14]
 
 col1, col2 = st.columns(2)
@@ -18,9 +19,16 @@ with col1:
     test_options = {
         "Mann-Whitney U Test": "mannwhitney",
         "T-Test (*Assumptions may not be met)": "t-test",
+        "Permutation Test (median difference)": "permutation",
     }
     selected_test = st.selectbox("", options=list(test_options.keys()))
     test_choice = test_options[selected_test]
+    value_options = {
+        "Relative frequency (%)": "percentage",
+        "Centered log-ratio (compositional)": "clr",
+    }
+    selected_value = st.radio("Test on", options=list(value_options.keys()))
+    value_col = value_options[selected_value]
 
 with col2:
     st.markdown("### 🕒 Select Time Since Treatment")
@@ -28,7 +36,9 @@ with col2:
         "", options=time_points, format_func=lambda t: f"day {t}" if t != 0 else "day 0"
     )
 
-response = requests.get(f"{API_URL}/{selected_time}/{test_choice}")
+response = requests.get(
+    f"{API_URL}/{selected_time}/{test_choice}", params={"value_col": value_col}
+)
 if response.status_code != 200:
     st.error("Failed to fetch data from backend.")
     st.stop()
@@ -36,6 +46,16 @@ if response.status_code != 200:
 data = response.json()
 df = pd.DataFrame(data)
 
+# Histograms and outliers behind the box plots; the plots fall back to summary stats only
+distribution_response = requests.get(
+    f"{DISTRIBUTION_URL}/{selected_time}", params={"bins": 40, "top_k": 10}
+)
+distributions = (
+    {(d["population"], d["response"]): d for d in distribution_response.json()}
+    if distribution_response.status_code == 200
+    else {}
+)
+
 st.markdown(
     "#### Manhattan plot: *Significance of cell population differences between responders and non-responders of Miraclib*"
 )
@@ -201,6 +221,35 @@ def draw_summary_boxplot(fig, x, stats, color, label):
     )
 
 
+def draw_distribution(fig, x, dist, color, label):
+    # Histogram as horizontal bars right of the box, scaled to the tallest bin
+    max_count = max((b["count"] for b in dist["histogram"]), default=0)
+    for b in dist["histogram"]:
+        fig.add_shape(
+            type="rect",
+            x0=x + 0.22,
+            x1=x + 0.22 + 0.25 * b["count"] / max_count,
+            y0=b["bin_start"],
+            y1=b["bin_end"],
+            line=dict(width=0),
+            fillcolor=color,
+            opacity=0.4,
+        )
+    outliers = dist["outliers"]
+    if outliers:
+        fig.add_trace(
+            go.Scatter(
+                x=[x] * len(outliers),
+                y=[o["percentage"] for o in outliers],
+                mode="markers",
+                marker=dict(symbol="circle-open", size=8, color=color),
+                showlegend=False,
+                text=[o["sample"] for o in outliers],
+                hovertemplate=f"<b>{label} outlier</b><br>%{{text}}: %{{y}}%<extra></extra>",
+            )
+        )
+
+
 def plot_box(pop, pop_df):
     fig = go.Figure()
     color_map = {"no": "#636EFA", "yes": "#EF553B"}
@@ -227,6 +276,14 @@ def plot_box(pop, pop_df):
             draw_summary_boxplot(
                 fig, x_map[resp], stats, color_map[resp], label_map[resp]
             )
+            dist = distributions.get((pop, resp))
+            if dist is not None:
+                draw_distribution(
+                    fig, x_map[resp], dist, color_map[resp], label_map[resp]
+                )
+                for o in dist["outliers"]:
+                    y_min = min(y_min, o["percentage"])
+                    y_max = max(y_max, o["percentage"])
             if resp == "yes":
                 pval = row.get("raw_p_value", None)
                 adj_pval = row.get("fdr_adj_p_val", None)
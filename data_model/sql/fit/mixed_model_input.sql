@@ -0,0 +1,15 @@
+-- Repeated-measures input of the per-population mixed effects models: every PBMC sample
+-- of melanoma patients treated with miraclib with a known response, across timepoints.
+SELECT
+    subject,
+    population,
+    percentage,
+    response,
+    time_from_treatment_start,
+    age,
+    sex
+FROM analysis.rcf_enriched
+WHERE sample_type = 'PBMC'
+    AND condition = 'melanoma'
+    AND treatment = 'miraclib'
+    AND response IS NOT NULL;
@@ -9,13 +9,15 @@ SELECT DISTINCT
     subject, condition, age, sex, treatment, response
 FROM staging.raw_table;
 
--- Insert into analysis.sample (metadata only)
+-- Insert into analysis.sample (metadata only). Rows are physically ordered by the
+-- dashboard filter columns so DuckDB zone maps can skip row groups.
 INSERT INTO analysis.sample (
     sample, subject, project, sample_type, time_from_treatment_start
 )
 SELECT DISTINCT
     sample, subject, project, sample_type, time_from_treatment_start
-FROM staging.raw_table;
+FROM staging.raw_table
+ORDER BY sample_type, time_from_treatment_start, sample;
 
 -- Insert into analysis.sample_cell_count (long format)
 INSERT INTO analysis.sample_cell_count (
@@ -32,19 +34,31 @@ UNION ALL
 SELECT sample, 'monocyte', monocyte FROM staging.raw_table;
 
 
--- Materialize relative cell frequency as a table
+-- Materialize relative cell frequency as a table, laid out in the same
+-- (sample_type, time_from_treatment_start, sample) order as analysis.sample.
+-- Percentages are closed compositions (they sum to 100 per sample), so the centered
+-- log-ratio is stored alongside: clr = ln(count + 0.5) - mean over the sample's
+-- populations of ln(count + 0.5). The 0.5 pseudocount is added to every count, not only
+-- to zeros, so all parts of a composition are shifted alike. Both come from one pass of
+-- window aggregates over sample_cell_count.
 CREATE OR REPLACE TABLE analysis.relative_cell_frequency AS
-WITH total_counts AS (
-    SELECT sample, SUM(count) AS total_count
+WITH sample_totals AS (
+    SELECT
+        sample,
+        population,
+        count,
+        SUM(count) OVER (PARTITION BY sample) AS total_count,
+        LN(count + 0.5) - AVG(LN(count + 0.5)) OVER (PARTITION BY sample) AS clr
     FROM analysis.sample_cell_count
-    GROUP BY sample
 )
 SELECT
     scc.sample,
-    tc.total_count,
+    scc.total_count,
     scc.population,
     scc.count,
-    ROUND(100.0 * scc.count / NULLIF(tc.total_count, 0), 2) AS percentage
-FROM analysis.sample_cell_count scc
-JOIN total_counts tc ON scc.sample = tc.sample;
+    ROUND(100.0 * scc.count / NULLIF(scc.total_count, 0), 2) AS percentage,
+    scc.clr
+FROM sample_totals scc
+JOIN analysis.sample s ON scc.sample = s.sample
+ORDER BY s.sample_type, s.time_from_treatment_start, scc.sample, scc.population;
 DROP SCHEMA IF EXISTS staging CASCADE;
@@ -0,0 +1,26 @@
+-- Wide table: relative cell frequencies denormalized with the sample and subject
+-- attributes the dashboard filters on, so hot queries scan one table instead of joining
+-- relative_cell_frequency ⋈ sample ⋈ subject. Same physical order as the base tables.
+-- ENUM-typed attributes keep their dictionary encoding from the base tables.
+DROP TABLE IF EXISTS analysis.rcf_enriched;
+CREATE TABLE analysis.rcf_enriched AS
+SELECT
+    rcf.sample,
+    rcf.total_count,
+    rcf.population,
+    rcf.count,
+    rcf.percentage,
+    rcf.clr,
+    s.subject,
+    s.project,
+    s.sample_type,
+    s.time_from_treatment_start,
+    subj.condition,
+    subj.treatment,
+    subj.response,
+    subj.sex,
+    subj.age
+FROM analysis.relative_cell_frequency rcf
+JOIN analysis.sample s ON rcf.sample = s.sample
+JOIN analysis.subject subj ON s.subject = subj.subject
+ORDER BY s.sample_type, s.time_from_treatment_start, rcf.sample, rcf.population;
@@ -0,0 +1,38 @@
+-- Materialize the subset analysis for every (treatment, condition, timepoint, sample_type)
+-- filter tuple in one GROUPING SETS pass over sample ⋈ subject. Each row holds one bar of
+-- the dashboard: samples per project, subjects by response or subjects by sex.
+CREATE OR REPLACE TABLE analysis.subset_analysis_cube AS
+SELECT
+    treatment,
+    condition,
+    time_from_treatment_start,
+    sample_type,
+    CASE GROUPING(project, response, sex)
+        WHEN 3 THEN 'project'
+        WHEN 5 THEN 'response'
+        WHEN 6 THEN 'sex'
+    END AS dimension,
+    project,
+    response,
+    sex,
+    count(*) AS sample_count,
+    count(DISTINCT subject) AS subject_count
+FROM (
+    SELECT
+        subj.treatment,
+        subj.condition,
+        s.time_from_treatment_start,
+        s.sample_type,
+        s.project,
+        subj.response,
+        subj.sex,
+        s.subject
+    FROM analysis.sample s
+    JOIN analysis.subject subj ON s.subject = subj.subject
+)
+GROUP BY GROUPING SETS (
+    (treatment, condition, time_from_treatment_start, sample_type, project),
+    (treatment, condition, time_from_treatment_start, sample_type, response),
+    (treatment, condition, time_from_treatment_start, sample_type, sex)
+)
+ORDER BY treatment, condition, time_from_treatment_start, sample_type, dimension;
@@ -0,0 +1,65 @@
+-- Partitioned storage (loader --storage parquet): moves the two large analysis tables
+-- out of the database file into hive-partitioned Parquet under @parquet_dir@, one
+-- directory per project=/time_from_treatment_start=, and replaces them with views of the
+-- same name and column types. Filters on the partition columns prune whole directories,
+-- so a query for one timepoint only reads that timepoint's files.
+-- Within each file rows keep the (sample_type, time_from_treatment_start, sample) order.
+COPY (
+    SELECT rcf.*, s.project, s.time_from_treatment_start
+    FROM analysis.relative_cell_frequency rcf
+    JOIN analysis.sample s ON rcf.sample = s.sample
+    ORDER BY s.sample_type, s.time_from_treatment_start, rcf.sample, rcf.population
+) TO '@parquet_dir@/relative_cell_frequency'
+(FORMAT PARQUET, PARTITION_BY (project, time_from_treatment_start));
+
+COPY (
+    SELECT *
+    FROM analysis.rcf_enriched
+    ORDER BY sample_type, time_from_treatment_start, sample, population
+) TO '@parquet_dir@/rcf_enriched'
+(FORMAT PARQUET, PARTITION_BY (project, time_from_treatment_start));
+
+DROP TABLE analysis.relative_cell_frequency;
+DROP TABLE analysis.rcf_enriched;
+
+-- Parquet has no ENUM or HUGEINT; cast back so readers see the types of the tables.
+-- The partition columns are typed through hive_types and left uncast, which keeps
+-- partition pruning on them.
+CREATE VIEW analysis.relative_cell_frequency AS
+SELECT
+    sample,
+    total_count::HUGEINT AS total_count,
+    population::analysis.population_enum AS population,
+    count,
+    percentage,
+    clr
+FROM read_parquet(
+    '@parquet_dir@/relative_cell_frequency/*/*/*.parquet',
+    hive_partitioning = true,
+    hive_types = {'project': VARCHAR, 'time_from_treatment_start': INTEGER}
+);
+
+CREATE VIEW analysis.rcf_enriched AS
+SELECT
+    sample,
+    total_count::HUGEINT AS total_count,
+    population::analysis.population_enum AS population,
+    count,
+    percentage,
+    clr,
+    subject,
+    project,
+    sample_type::analysis.sample_type_enum AS sample_type,
+    time_from_treatment_start,
+    condition::analysis.condition_enum AS condition,
+    treatment::analysis.treatment_enum AS treatment,
+    response::analysis.response_enum AS response,
+    sex::analysis.sex_enum AS sex,
+    age
+FROM read_parquet(
+    '@parquet_dir@/rcf_enriched/*/*/*.parquet',
+    hive_partitioning = true,
+    hive_types = {'project': VARCHAR, 'time_from_treatment_start': INTEGER}
+);
+
+CHECKPOINT;
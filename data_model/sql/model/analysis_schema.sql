@@ -1,10 +1,43 @@
+DROP TABLE IF EXISTS analysis.subset_analysis_cube;
+DROP TABLE IF EXISTS analysis.rcf_enriched;
+DROP TABLE IF EXISTS analysis.relative_cell_frequency;
 DROP TABLE IF EXISTS analysis.sample_cell_count;
 DROP TABLE IF EXISTS analysis.sample;
 DROP TABLE IF EXISTS analysis.subject;
 DROP TABLE IF EXISTS analysis.project;
+DROP TYPE IF EXISTS analysis.population_enum;
+DROP TYPE IF EXISTS analysis.sample_type_enum;
+DROP TYPE IF EXISTS analysis.condition_enum;
+DROP TYPE IF EXISTS analysis.treatment_enum;
+DROP TYPE IF EXISTS analysis.response_enum;
+DROP TYPE IF EXISTS analysis.sex_enum;
 
 CREATE SCHEMA IF NOT EXISTS analysis;
 
+-- Low-cardinality columns are dictionary-encoded as ENUMs built from the staged values,
+-- so this file runs after load_staging_data.sql. Filters, joins and group-bys on them
+-- compare small integer codes instead of strings.
+-- Populations are the cell count columns unpivoted in load_analysis_data.sql.
+CREATE TYPE analysis.population_enum AS ENUM (
+    'b_cell', 'cd4_t_cell', 'cd8_t_cell', 'monocyte', 'nk_cell'
+);
+CREATE TYPE analysis.sample_type_enum AS ENUM (
+    SELECT DISTINCT sample_type FROM staging.raw_table
+    WHERE sample_type IS NOT NULL ORDER BY 1
+);
+CREATE TYPE analysis.condition_enum AS ENUM (
+    SELECT DISTINCT condition FROM staging.raw_table WHERE condition IS NOT NULL ORDER BY 1
+);
+CREATE TYPE analysis.treatment_enum AS ENUM (
+    SELECT DISTINCT treatment FROM staging.raw_table WHERE treatment IS NOT NULL ORDER BY 1
+);
+CREATE TYPE analysis.response_enum AS ENUM (
+    SELECT DISTINCT response FROM staging.raw_table WHERE response IS NOT NULL ORDER BY 1
+);
+CREATE TYPE analysis.sex_enum AS ENUM (
+    SELECT DISTINCT sex FROM staging.raw_table WHERE sex IS NOT NULL ORDER BY 1
+);
+
 CREATE TABLE analysis.project (
     project TEXT PRIMARY KEY,
     description TEXT
@@ -12,18 +45,18 @@ CREATE TABLE analysis.project (
 
 CREATE TABLE analysis.subject (
     subject TEXT PRIMARY KEY,
-    condition TEXT,
+    condition analysis.condition_enum,
     age INTEGER,
-    sex TEXT,
-    treatment TEXT,
-    response TEXT
+    sex analysis.sex_enum,
+    treatment analysis.treatment_enum,
+    response analysis.response_enum
 );
 
 CREATE TABLE analysis.sample (
     sample TEXT PRIMARY KEY,
     subject TEXT,
     project TEXT,
-    sample_type TEXT,
+    sample_type analysis.sample_type_enum,
     time_from_treatment_start INTEGER,
     FOREIGN KEY (subject) REFERENCES analysis.subject(subject),
     FOREIGN KEY (project) REFERENCES analysis.project(project)
@@ -31,7 +64,7 @@ CREATE TABLE analysis.sample (
 
 CREATE TABLE analysis.sample_cell_count (
     sample TEXT,
-    population TEXT,
+    population analysis.population_enum,
     count INTEGER,
     PRIMARY KEY (sample, population),
     FOREIGN KEY (sample) REFERENCES analysis.sample(sample)
@@ -0,0 +1,60 @@
+-- Sanity checks run against a freshly built database before it is published.
+-- Each row is one check; the build is rejected if any check reports failures.
+SELECT 'subject_not_empty' AS check_name, CASE WHEN count(*) = 0 THEN 1 ELSE 0 END AS failures
+FROM analysis.subject
+UNION ALL
+SELECT 'sample_not_empty', CASE WHEN count(*) = 0 THEN 1 ELSE 0 END
+FROM analysis.sample
+UNION ALL
+SELECT 'relative_cell_frequency_not_empty', CASE WHEN count(*) = 0 THEN 1 ELSE 0 END
+FROM analysis.relative_cell_frequency
+UNION ALL
+-- Every sample must belong to a known subject and project
+SELECT 'sample_orphans', count(*)
+FROM analysis.sample s
+LEFT JOIN analysis.subject subj ON s.subject = subj.subject
+LEFT JOIN analysis.project p ON s.project = p.project
+WHERE subj.subject IS NULL OR p.project IS NULL
+UNION ALL
+-- One relative frequency row per (sample, population) cell count
+SELECT 'relative_cell_frequency_row_count', abs(
+    (SELECT count(*) FROM analysis.relative_cell_frequency)
+    - (SELECT count(*) FROM analysis.sample_cell_count)
+)
+UNION ALL
+-- Percentages are rounded to 2 decimals, so allow a small tolerance around 100
+SELECT 'percentage_sums_to_100', count(*)
+FROM (
+    SELECT sample
+    FROM analysis.relative_cell_frequency
+    WHERE total_count > 0
+    GROUP BY sample
+    HAVING abs(sum(percentage) - 100) > 0.1
+)
+UNION ALL
+-- Centered log-ratios sum to 0 within each sample
+SELECT 'clr_sums_to_0', count(*)
+FROM (
+    SELECT sample
+    FROM analysis.relative_cell_frequency
+    GROUP BY sample
+    HAVING abs(sum(clr)) > 1e-6
+)
+UNION ALL
+-- The wide table carries exactly one row per relative frequency
+SELECT 'rcf_enriched_row_count', abs(
+    (SELECT count(*) FROM analysis.rcf_enriched)
+    - (SELECT count(*) FROM analysis.relative_cell_frequency)
+)
+UNION ALL
+-- Every population has fitted mixed effects model terms
+SELECT 'model_results_populations', abs(
+    (SELECT count(DISTINCT population) FROM analysis.relative_cell_frequency)
+    - (SELECT count(DISTINCT population) FROM analysis.model_results)
+)
+UNION ALL
+-- The project slices of the subset analysis cube partition the samples
+SELECT 'subset_analysis_cube_sample_total', abs(
+    (SELECT count(*) FROM analysis.sample)
+    - (SELECT sum(sample_count) FROM analysis.subset_analysis_cube WHERE dimension = 'project')::BIGINT
+);
@@ -0,0 +1,69 @@
+-- Row-level checks over staging.raw_table, run before the analysis tables are built.
+-- Failing rows are moved to quarantine.raw_table with the names of the checks they
+-- failed, instead of aborting the load later on a constraint violation.
+-- Checks across rows are set-based aggregates over the key columns only, so memory use
+-- stays bounded by the number of subjects and samples rather than the row width. One
+-- scan of the staged rows then applies the row predicates and semi-joins the offending
+-- keys.
+CREATE SCHEMA IF NOT EXISTS quarantine;
+
+-- One subject row is loaded per subject; all rows must agree on its attributes
+CREATE OR REPLACE TEMP TABLE conflicting_subjects AS
+SELECT subject
+FROM staging.raw_table
+GROUP BY subject
+HAVING count(DISTINCT (condition, age, sex, treatment, response)) > 1;
+
+CREATE OR REPLACE TEMP TABLE duplicate_samples AS
+SELECT sample
+FROM staging.raw_table
+GROUP BY sample
+HAVING count(*) > 1;
+
+CREATE OR REPLACE TABLE quarantine.raw_table AS
+SELECT *
+FROM (
+    SELECT
+        raw.rowid AS staging_rowid,
+        raw.*,
+        list_filter([
+            CASE WHEN raw.project IS NULL OR raw.subject IS NULL OR raw.sample IS NULL
+                    OR raw.sample_type IS NULL OR raw.time_from_treatment_start IS NULL
+                    OR raw.condition IS NULL OR raw.treatment IS NULL
+                    OR raw.b_cell IS NULL OR raw.cd8_t_cell IS NULL
+                    OR raw.cd4_t_cell IS NULL OR raw.nk_cell IS NULL
+                    OR raw.monocyte IS NULL
+                THEN 'missing_value' END,
+            CASE WHEN least(
+                    raw.b_cell, raw.cd8_t_cell, raw.cd4_t_cell, raw.nk_cell, raw.monocyte
+                ) < 0
+                THEN 'negative_count' END,
+            -- The dashboard and API only know these labels
+            CASE WHEN raw.sex NOT IN ('M', 'F') OR raw.response NOT IN ('yes', 'no')
+                THEN 'unknown_enum_value' END,
+            CASE WHEN cs.subject IS NOT NULL THEN 'conflicting_subject' END,
+            CASE WHEN ds.sample IS NOT NULL THEN 'duplicate_sample' END
+        ], check_name -> check_name IS NOT NULL) AS failed_checks
+    FROM staging.raw_table raw
+    LEFT JOIN conflicting_subjects cs ON raw.subject = cs.subject
+    LEFT JOIN duplicate_samples ds ON raw.sample = ds.sample
+)
+WHERE len(failed_checks) > 0;
+
+DELETE FROM staging.raw_table
+WHERE rowid IN (SELECT staging_rowid FROM quarantine.raw_table);
+
+DROP TABLE conflicting_subjects;
+DROP TABLE duplicate_samples;
+
+-- Quarantined rows per check; a row failing several checks counts for each
+SELECT checks.check_name, count(q.check_name) AS quarantined_rows
+FROM (
+    VALUES ('missing_value'), ('negative_count'), ('unknown_enum_value'),
+        ('conflicting_subject'), ('duplicate_sample')
+) AS checks (check_name)
+LEFT JOIN (
+    SELECT unnest(failed_checks) AS check_name FROM quarantine.raw_table
+) AS q ON checks.check_name = q.check_name
+GROUP BY checks.check_name
+ORDER BY checks.check_name;
@@ -0,0 +1,163 @@
+"""
+This script benchmarks the database queries behind every API endpoint against each DBConn
+backend serving the published database, and reports the fastest backend per query.
+
+Backends, all serving the database version the configured path currently points to:
+    duckdb         the DuckDB file itself, as served by default
+    duckdb_memory  an in-memory DuckDB copy of the analysis schema
+    sqlite         a SQLite replica of the analysis schema, with the DuckDB aggregates
+                   the queries use registered as Python functions
+
+Response caches are bypassed: each query goes through the crud layer straight to the
+backend.
+
+Usage:
+    PYTHONPATH=src python scripts/benchmark_backends.py --repeat 20
+"""
+
+from db import crud
+from db.connection import create_db_connection
+
+import argparse
+import json
+import logging
+import numpy as np
+import os
+import time
+import yaml
+
+# --- Constants ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, "..", "data")
+BACKENDS = ["duckdb", "duckdb_memory", "sqlite"]
+
+TIME_FROM_TREATMENT_START = 7
+
+# Endpoint -> the crud call answering it on a cache miss
+ENDPOINT_QUERIES = {
+    "relative_cell_frequency": lambda conn: crud.fetch_relative_cell_frequency(
+        conn=conn
+    ),
+    "boxplot_stats": lambda conn: crud.fetch_boxplot_data(
+        conn=conn, time_from_treatment_start=TIME_FROM_TREATMENT_START
+    ),
+    "boxplot_stats_test_rows": lambda conn: crud.fetch_relative_cell_frequency(
+        conn=conn,
+        additional_filters=True,
+        time_from_treatment_start=TIME_FROM_TREATMENT_START,
+    ),
+    "longitudinal": lambda conn: crud.fetch_paired_timepoints(
+        conn=conn, time_from_treatment_start=TIME_FROM_TREATMENT_START
+    ),
+    "distribution_histograms": lambda conn: crud.fetch_histograms(
+        conn=conn, time_from_treatment_start=TIME_FROM_TREATMENT_START
+    ),
+    "distribution_outliers": lambda conn: crud.fetch_outliers(
+        conn=conn, time_from_treatment_start=TIME_FROM_TREATMENT_START
+    ),
+    "mixed_model": lambda conn: crud.fetch_model_results(conn=conn),
+    # fetch_dynamic_subset_analysis answers from the cube cached per engine; time the live
+    # query behind it instead, which is what reaches the backend
+    "subset_analysis": lambda conn: crud._live_subset_analysis(
+        conn=conn,
+        treatment="miraclib",
+        condition="melanoma",
+        sample_type="PBMC",
+        time_from_treatment_start=TIME_FROM_TREATMENT_START,
+    ),
+}
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+_logger = logging.getLogger(__name__)
+
+
+def _arg_parse():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the endpoint queries per database backend."
+    )
+    parser.add_argument(
+        "--config-path",
+        type=str,
+        default=f"{DATA_DIR}/duckdb_api_config.yaml",
+        help="Path to DB YAML config file; its database is served by every backend.",
+    )
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=BACKENDS,
+        choices=BACKENDS,
+        help="Backends to benchmark.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=20,
+        help="Timed executions per query and backend.",
+    )
+    parser.add_argument(
+        "--output-json",
+        type=str,
+        default=None,
+        help="Optional path to write the timings as JSON.",
+    )
+    return parser.parse_args()
+
+
+def _time_query(query, conn, repeat: int) -> dict:
+    query(conn)  # build the engine, reflect and compile, warm buffers
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        query(conn)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(float(np.median(timings)), 3),
+        "p95_ms": round(float(np.percentile(timings, 95)), 3),
+    }
+
+
+def run_benchmark(config: dict, backends: list, repeat: int) -> list:
+    results = []
+    for backend in backends:
+        conn = create_db_connection(dict(config, db_type=backend, read_only=True))
+        start = time.perf_counter()
+        with conn.pin_version() as version:
+            _logger.info(
+                f"{backend}: serving {version}, engine ready in "
+                f"{time.perf_counter() - start:.2f}s"
+            )
+            for query_name, query in ENDPOINT_QUERIES.items():
+                timing = _time_query(query, conn, repeat)
+                timing.update(query=query_name, backend=backend)
+                results.append(timing)
+                _logger.info(
+                    f"{query_name:<26} {backend:<14} "
+                    f"median={timing['median_ms']:>9.3f}ms p95={timing['p95_ms']:>9.3f}ms"
+                )
+        conn.close()
+
+    for query_name in ENDPOINT_QUERIES:
+        timings = [r for r in results if r["query"] == query_name]
+        fastest = min(timings, key=lambda r: r["median_ms"])
+        for timing in timings:
+            timing["vs_fastest"] = round(timing["median_ms"] / fastest["median_ms"], 2)
+        _logger.info(
+            f"{query_name:<26} fastest: {fastest['backend']} "
+            f"({fastest['median_ms']:.3f}ms)"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    args = _arg_parse()
+
+    with open(args.config_path) as f:
+        config = yaml.safe_load(f)
+    results = run_benchmark(config, args.backends, args.repeat)
+
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump(results, f, indent=2)
+        _logger.info(f"Wrote timings to {args.output_json}")
@@ -0,0 +1,252 @@
+"""
+This script benchmarks the hot dashboard queries against different physical layouts of the
+analysis tables and reports before/after timings.
+
+Layouts, built in memory from the published database (optionally replicated `--scale` times
+so the tables span many row groups):
+    before  tables in sample id order, queries join relative_cell_frequency ⋈ sample ⋈ subject
+    after   tables ordered by (sample_type, time_from_treatment_start, sample) so zone maps
+            prune row groups, queried with the same joins
+    wide    the `after` order, queried through the denormalized, ENUM-typed rcf_enriched
+            table
+
+Usage:
+    python benchmark_queries.py --scale 50 --repeat 20
+"""
+
+import argparse
+import duckdb
+import json
+import logging
+import numpy as np
+import os
+import time
+import yaml
+
+# --- Constants ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, "..", "data")
+
+FILTERS = {
+    "sample_type": "PBMC",
+    "condition": "melanoma",
+    "treatment": "miraclib",
+    "time_from_treatment_start": 0,
+}
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+_logger = logging.getLogger(__name__)
+
+
+def _arg_parse():
+    parser = argparse.ArgumentParser(
+        description="Benchmark dashboard queries per layout."
+    )
+    parser.add_argument(
+        "--config-path",
+        type=str,
+        default=f"{DATA_DIR}/duckdb_config.yaml",
+        help="Path to DB YAML config file; its database is the benchmark source.",
+    )
+    parser.add_argument(
+        "--scale",
+        type=int,
+        default=20,
+        help="Replicate every sample/subject this many times before benchmarking.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=20,
+        help="Timed executions per query and layout.",
+    )
+    parser.add_argument(
+        "--output-json",
+        type=str,
+        default=None,
+        help="Optional path to write the timings as JSON.",
+    )
+    return parser.parse_args()
+
+
+def _build_layouts(conn, scale: int):
+    """
+    Create the `before` and `after` schemas from the attached source database.
+    """
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TEMP TABLE rep AS SELECT range AS rep FROM range({scale});
+
+        CREATE SCHEMA before;
+        CREATE TABLE before.subject AS
+        SELECT subject || '_' || rep AS subject, * EXCLUDE (subject, rep)
+        FROM src.analysis.subject, rep
+        ORDER BY subject;
+        CREATE TABLE before.sample AS
+        SELECT sample || '_' || rep AS sample, subject || '_' || rep AS subject,
+               * EXCLUDE (sample, subject, rep)
+        FROM src.analysis.sample, rep
+        ORDER BY sample;
+        CREATE TABLE before.relative_cell_frequency AS
+        SELECT sample || '_' || rep AS sample, * EXCLUDE (sample, rep)
+        FROM src.analysis.relative_cell_frequency, rep
+        ORDER BY sample, population;
+
+        CREATE SCHEMA after;
+        CREATE TABLE after.subject AS SELECT * FROM before.subject;
+        CREATE TABLE after.sample AS
+        SELECT * FROM before.sample
+        ORDER BY sample_type, time_from_treatment_start, sample;
+        CREATE TABLE after.relative_cell_frequency AS
+        SELECT rcf.*
+        FROM before.relative_cell_frequency rcf
+        JOIN after.sample s ON rcf.sample = s.sample
+        ORDER BY s.sample_type, s.time_from_treatment_start, rcf.sample, rcf.population;
+        CREATE TYPE population_enum AS ENUM (
+            SELECT DISTINCT population FROM after.relative_cell_frequency ORDER BY 1
+        );
+        CREATE TYPE sample_type_enum AS ENUM (
+            SELECT DISTINCT sample_type FROM after.sample ORDER BY 1
+        );
+        CREATE TYPE response_enum AS ENUM (
+            SELECT DISTINCT response FROM after.subject
+            WHERE response IS NOT NULL ORDER BY 1
+        );
+        CREATE TYPE sex_enum AS ENUM (
+            SELECT DISTINCT sex FROM after.subject ORDER BY 1
+        );
+        CREATE TABLE after.rcf_enriched AS
+        SELECT rcf.sample, rcf.total_count,
+               rcf.population::population_enum AS population,
+               rcf.count, rcf.percentage, s.subject, s.project,
+               s.sample_type::sample_type_enum AS sample_type,
+               s.time_from_treatment_start, subj.condition, subj.treatment,
+               subj.response::response_enum AS response,
+               subj.sex::sex_enum AS sex, subj.age
+        FROM after.relative_cell_frequency rcf
+        JOIN after.sample s ON rcf.sample = s.sample
+        JOIN after.subject subj ON s.subject = subj.subject
+        ORDER BY s.sample_type, s.time_from_treatment_start, rcf.sample, rcf.population;
+        """
+    )
+
+
+_BOXPLOT_AGGREGATES = """
+    population, response, time_from_treatment_start,
+    round(avg(percentage), 3) AS avg_percentage,
+    round(quantile_cont(percentage, 0.25), 3) AS q1,
+    round(median(percentage), 3) AS median,
+    round(quantile_cont(percentage, 0.75), 3) AS q3
+"""
+
+_JOIN = """
+    {schema}.relative_cell_frequency rcf
+    JOIN {schema}.sample s ON rcf.sample = s.sample
+    JOIN {schema}.subject subj ON s.subject = subj.subject
+"""
+
+_FILTER = """
+    sample_type = $sample_type AND time_from_treatment_start = $time_from_treatment_start
+    AND condition = $condition AND treatment = $treatment
+"""
+
+QUERIES = {
+    "boxplot_summary": {
+        "join": f"""
+            SELECT {_BOXPLOT_AGGREGATES} FROM {_JOIN}
+            WHERE {_FILTER} AND response IS NOT NULL
+            GROUP BY population, response, time_from_treatment_start
+        """,
+        "wide": f"""
+            SELECT {_BOXPLOT_AGGREGATES} FROM {{schema}}.rcf_enriched
+            WHERE {_FILTER} AND response IS NOT NULL
+            GROUP BY population, response, time_from_treatment_start
+        """,
+    },
+    "stats_test_rows": {
+        "join": f"""
+            SELECT rcf.*, response, time_from_treatment_start FROM {_JOIN}
+            WHERE {_FILTER} AND response IS NOT NULL
+        """,
+        "wide": f"""
+            SELECT sample, total_count, population, count, percentage, response,
+                   time_from_treatment_start
+            FROM {{schema}}.rcf_enriched
+            WHERE {_FILTER} AND response IS NOT NULL
+        """,
+    },
+    # Subject-level query: the wide table holds one row per population, so it has no
+    # wide variant
+    "subset_subjects_by_response": {
+        "join": f"""
+            SELECT response, count(DISTINCT subj.subject) AS subject_count
+            FROM {{schema}}.sample s JOIN {{schema}}.subject subj ON s.subject = subj.subject
+            WHERE {_FILTER}
+            GROUP BY response
+        """,
+    },
+}
+
+LAYOUTS = [
+    ("before", "before", "join"),
+    ("after", "after", "join"),
+    ("wide", "after", "wide"),
+]
+
+
+def _time_query(conn, sql: str, repeat: int) -> dict:
+    conn.execute(sql, FILTERS).fetchall()  # warm buffers and the plan cache
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(sql, FILTERS).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(float(np.median(timings)), 3),
+        "p95_ms": round(float(np.percentile(timings, 95)), 3),
+    }
+
+
+def run_benchmark(database: str, scale: int, repeat: int) -> list:
+    conn = duckdb.connect()
+    conn.execute(f"ATTACH '{database}' AS src (READ_ONLY)")
+    _logger.info(f"Building layouts from {database} at scale {scale}")
+    _build_layouts(conn, scale)
+    rows = conn.execute("SELECT count(*) FROM after.rcf_enriched").fetchone()[0]
+    _logger.info(f"Benchmarking on {rows} relative frequency rows")
+
+    results = []
+    for query_name, variants in QUERIES.items():
+        baseline = None
+        for layout, schema, variant in LAYOUTS:
+            if variant not in variants:
+                continue
+            timing = _time_query(conn, variants[variant].format(schema=schema), repeat)
+            baseline = baseline or timing["median_ms"]
+            timing.update(
+                query=query_name,
+                layout=layout,
+                speedup=round(baseline / timing["median_ms"], 2),
+            )
+            results.append(timing)
+            _logger.info(
+                f"{query_name:<30} {layout:<8} median={timing['median_ms']:>9.3f}ms "
+                f"p95={timing['p95_ms']:>9.3f}ms speedup={timing['speedup']:>5.2f}x"
+            )
+    conn.close()
+    return results
+
+
+if __name__ == "__main__":
+    args = _arg_parse()
+
+    with open(args.config_path) as f:
+        config = yaml.safe_load(f)
+    results = run_benchmark(config["database"], args.scale, args.repeat)
+
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump(results, f, indent=2)
+        _logger.info(f"Wrote timings to {args.output_json}")
@@ -1,15 +1,24 @@
 """
 This script executes external SQL files to create schemas and load CSV data.
 
+The database is built into a fresh versioned file next to the configured `database` path,
+validated, and only then published by atomically re-pointing the configured path (a
+symlink) at it. The API keeps serving the previous version until the swap.
+
 Usage:
     python create_schema_and_load_data.py 
 """
 
 import argparse
+import glob
 import logging
 import os
+import shutil
+import time
 import yaml
-from db.connection import create_db_connection
+from datetime import datetime, timezone
+from db.connection import create_db_connection, publish_database
+from mixed_models import fit_population_models
 
 # --- Constants ---
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -18,10 +27,18 @@ CSV_DATA_DIR = os.path.join(SCRIPT_DIR, "..", "data/raw_csv")
 DATA_DIR = os.path.join(SCRIPT_DIR, "..", "data")
 DEFAULT_SQL_FILES = [
     "model/staging_schema.sql",
-    "model/analysis_schema.sql",
     "load/load_staging_data.sql",
-    "load/load_analysis_data.sql"
+    # Moves rows failing the checks to quarantine.raw_table
+    "validate/validate_staging_data.sql",
+    # Creates its ENUM types from the staged values
+    "model/analysis_schema.sql",
+    "load/load_analysis_data.sql",
+    "load/load_rcf_enriched.sql",
+    "load/load_subset_analysis_cube.sql"
 ]
+DEFAULT_VALIDATION_SQL = "validate/validate_analysis_data.sql"
+MODEL_INPUT_SQL = "fit/mixed_model_input.sql"
+PARTITION_SQL = "load/partition_parquet.sql"
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 _logger = logging.getLogger(__name__)
@@ -53,6 +70,36 @@ def _arg_parse():
         default=CSV_DATA_DIR,
         help="Directory containing CSV files to substitute into load_staging_data.sql files."
     )
+    parser.add_argument(
+        "--model-workers",
+        type=int,
+        default=None,
+        help="Worker processes for fitting the per-population mixed effects models. Defaults to the CPU count."
+    )
+    parser.add_argument(
+        "--validation-sql",
+        type=str,
+        default=DEFAULT_VALIDATION_SQL,
+        help="SQL file (relative to --sql-dir) with checks the new database must pass."
+    )
+    parser.add_argument(
+        "--versions-dir",
+        type=str,
+        default=None,
+        help="Directory for versioned database files. Defaults to 'versions' next to the configured database."
+    )
+    parser.add_argument(
+        "--keep-versions",
+        type=int,
+        default=3,
+        help="Number of most recent database versions to keep on disk, including the published one."
+    )
+    parser.add_argument(
+        "--storage",
+        choices=["duckdb", "parquet"],
+        default="duckdb",
+        help="Where the relative frequency tables live: in the database file, or in hive-partitioned Parquet next to it (project=/time_from_treatment_start=) behind views."
+    )
     return parser.parse_args()
 
 
@@ -90,21 +137,148 @@ def _execute_sql_files(conn, sql_files, csv_files):
                     sql = sql_template.replace("@csv_path@", csv_file)
                     _logger.info(f"Inserting CSV {csv_file} into staging.raw_table")
                     conn.execute(sql, ddl=True)
+        elif "validate_staging_data.sql" in filename:
+            _quarantine_invalid_rows(conn, sql_template)
         else:
             sql = sql_template
             _logger.info(f"Executing SQL: {sql_file}")
             conn.execute(sql, ddl=True)
 
+
+def _quarantine_invalid_rows(conn, sql):
+    """
+    Run the set-based row checks over staging.raw_table, moving failing rows to
+    quarantine.raw_table, and log quarantined rows per check and the throughput.
+    """
+    staged_rows = int(conn.execute("SELECT count(*) AS n FROM staging.raw_table").n[0])
+    start = time.perf_counter()
+    summary = conn.execute(sql)
+    elapsed = time.perf_counter() - start
+    for row in summary.itertuples():
+        _logger.info(f"Staging check {row.check_name}: {row.quarantined_rows} row(s) quarantined")
+    quarantined = int(conn.execute("SELECT count(*) AS n FROM quarantine.raw_table").n[0])
+    _logger.info(
+        f"Validated {staged_rows} staged rows in {elapsed:.2f}s "
+        f"({staged_rows / max(elapsed, 1e-9):,.0f} rows/s), quarantined {quarantined}"
+    )
+
+
+def _new_version_path(link_path, versions_dir):
+    stem = os.path.splitext(os.path.basename(link_path))[0]
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    return os.path.join(versions_dir, f"{stem}-{version}.duckdb")
+
+
+def _parquet_dir(version_path):
+    return f"{os.path.splitext(version_path)[0]}.parquet"
+
+
+def _partition_to_parquet(conn, partition_sql_file, parquet_dir):
+    """
+    Move relative_cell_frequency and rcf_enriched to hive-partitioned Parquet files under
+    parquet_dir, leaving views in their place, so queries read only matching partitions.
+    """
+    os.makedirs(parquet_dir)
+    with open(partition_sql_file, "r") as f:
+        sql = f.read().replace("@parquet_dir@", os.path.abspath(parquet_dir))
+    _logger.info(f"Writing partitioned Parquet to {parquet_dir}")
+    conn.execute(sql, ddl=True)
+    files = glob.glob(os.path.join(parquet_dir, "*", "*", "*", "*.parquet"))
+    _logger.info(f"Wrote {len(files)} Parquet files")
+
+
+def _fit_models(conn, model_input_sql_file, dataset_version, max_workers):
+    """
+    Fit the mixed effects model of every population and store the results in
+    analysis.model_results, so the API serves them without fitting in the request path.
+    """
+    model_input = conn.execute_file(model_input_sql_file)
+    _logger.info(f"Fitting mixed effects models on {len(model_input)} rows")
+    results = fit_population_models(model_input, max_workers=max_workers)
+    conn.connect().register("model_results_frame", results)
+    conn.execute(
+        "CREATE OR REPLACE TABLE analysis.model_results AS "
+        "SELECT $dataset_version AS dataset_version, * FROM model_results_frame",
+        params={"dataset_version": dataset_version},
+        ddl=True,
+    )
+    conn.connect().unregister("model_results_frame")
+
+
+def _validate_database(conn, validation_sql_file):
+    checks = conn.execute_file(validation_sql_file)
+    for row in checks.itertuples():
+        _logger.info(f"Validation check {row.check_name}: {row.failures} failure(s)")
+    failed = checks[checks.failures > 0]
+    if not failed.empty:
+        raise ValueError(
+            f"Database validation failed: {', '.join(failed.check_name)}"
+        )
+
+
+def _prune_versions(link_path, versions_dir, keep):
+    stem = os.path.splitext(os.path.basename(link_path))[0]
+    published = os.path.realpath(link_path)
+    versions = sorted(glob.glob(os.path.join(versions_dir, f"{stem}-*.duckdb")), reverse=True)
+    if len(versions) > 1 and os.path.isdir(_parquet_dir(versions[1])):
+        # Views open their Parquet files on every scan, so workers still pinned to the
+        # previous version need its directory; it is kept whatever --keep-versions says
+        keep = max(keep, 2)
+    for path in versions[keep:]:
+        if os.path.realpath(path) == published:
+            continue
+        # Readers still holding an old .duckdb file keep their open handle after the
+        # unlink. That does not hold for its Parquet files: a worker still pinned to a
+        # version removed here fails on its next scan of the partitioned tables.
+        _logger.info(f"Removing old database version {path}")
+        for stale in (path, f"{path}.wal"):
+            if os.path.exists(stale):
+                os.remove(stale)
+        shutil.rmtree(_parquet_dir(path), ignore_errors=True)
+
+
 if __name__ == "__main__":
     args = _arg_parse()
 
     with open(args.config_path) as f:
         config = yaml.safe_load(f)
-    conn = create_db_connection(config)
+    link_path = config["database"]
+    versions_dir = args.versions_dir or os.path.join(os.path.dirname(link_path), "versions")
+    os.makedirs(versions_dir, exist_ok=True)
+    version_path = _new_version_path(link_path, versions_dir)
+
     csv_files = [
         os.path.join(args.csv_path_dir, f)
         for f in os.listdir(args.csv_path_dir)
         if f.endswith('.csv')
     ]    
     sql_files = _get_sql_files(args.sql_dir, args.sql_paths)
-    _execute_sql_files(conn, sql_files, csv_files)
+
+    _logger.info(f"Building new database version {version_path}")
+    try:
+        with create_db_connection(dict(config, database=version_path, read_only=False)) as conn:
+            _execute_sql_files(conn, sql_files, csv_files)
+            _fit_models(
+                conn,
+                os.path.join(args.sql_dir, MODEL_INPUT_SQL),
+                os.path.basename(version_path),
+                args.model_workers,
+            )
+            if args.storage == "parquet":
+                _partition_to_parquet(
+                    conn,
+                    os.path.join(args.sql_dir, PARTITION_SQL),
+                    _parquet_dir(version_path),
+                )
+            _validate_database(conn, os.path.join(args.sql_dir, args.validation_sql))
+    except Exception:
+        _logger.exception(f"Build failed, keeping the published database at {link_path}")
+        for partial in (version_path, f"{version_path}.wal"):
+            if os.path.exists(partial):
+                os.remove(partial)
+        shutil.rmtree(_parquet_dir(version_path), ignore_errors=True)
+        raise
+
+    publish_database(version_path, link_path)
+    _logger.info(f"Published {version_path} as {link_path}")
+    _prune_versions(link_path, versions_dir, args.keep_versions)
@@ -0,0 +1,334 @@
+"""
+This script replays a configurable mix of dashboard requests against the REST API at a fixed
+concurrency and reports throughput, tail latency and error rate.
+
+The API can either be served in-process through FastAPI's TestClient or by a locally launched
+uvicorn with one or more worker processes, so deployments can be sized by sweeping the
+worker/thread grid.
+
+Usage:
+    PYTHONPATH=src python scripts/load_test_service.py --mode uvicorn --workers 1 2 4 --concurrency 8 32
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import argparse
+import httpx
+import json
+import logging
+import numpy as np
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+# --- Constants ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(SCRIPT_DIR, "..")
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+
+# Mirrors the options offered by the Streamlit pages in dashboard_app/pages
+PAGE_SIZE = 50
+MAX_PAGE = 1000
+TIME_POINTS = [0, 7, 14]
+TEST_CHOICES = ["mannwhitney", "t-test"]
+SUBSET_FILTERS = [
+    ("miraclib", "melanoma"),
+    ("miraclib", "carcinoma"),
+    ("phauximab", "melanoma"),
+    ("phauximab", "carcinoma"),
+    ("none", "healthy"),
+]
+SAMPLE_TYPES = ["PBMC", "WB"]
+DEFAULT_MIX = "relative_cell_frequency=0.5,boxplot_stats=0.3,subset_analysis=0.2"
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+_logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def _arg_parse():
+    parser = argparse.ArgumentParser(
+        description="Load test the cell analysis REST API."
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["inprocess", "uvicorn"],
+        default="inprocess",
+        help="Serve the API in-process via TestClient or launch a local uvicorn.",
+    )
+    parser.add_argument(
+        "--workers",
+        nargs="+",
+        type=int,
+        default=[1],
+        help="Uvicorn worker process counts to sweep (ignored in inprocess mode).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        nargs="+",
+        type=int,
+        default=[8],
+        help="Client thread counts to sweep; each thread keeps one request in flight.",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=500,
+        help="Number of measured requests per configuration.",
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=20,
+        help="Number of unmeasured requests issued before each configuration.",
+    )
+    parser.add_argument(
+        "--mix",
+        type=str,
+        default=DEFAULT_MIX,
+        help="Comma separated route=weight pairs for the request mix.",
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output-json",
+        type=str,
+        default=None,
+        help="Optional path to write the per-configuration report as JSON.",
+    )
+    return parser.parse_args()
+
+
+def _parse_mix(mix: str) -> dict:
+    weights = {}
+    for item in mix.split(","):
+        route, weight = item.split("=")
+        if route not in ROUTE_BUILDERS:
+            raise ValueError(f"Unknown route in mix: {route}")
+        weights[route] = float(weight)
+    return weights
+
+
+def _relative_cell_frequency_path(rng: random.Random) -> str:
+    # Users mostly browse the first pages of the summary table
+    page = min(int(rng.expovariate(1 / 20)) + 1, MAX_PAGE)
+    return f"/analysis_results/relative_cell_frequency?page={page}&size={PAGE_SIZE}"
+
+
+def _boxplot_stats_path(rng: random.Random) -> str:
+    time_point = rng.choice(TIME_POINTS)
+    test_choice = rng.choice(TEST_CHOICES)
+    return f"/analysis_results/boxplot_stats/{time_point}/{test_choice}"
+
+
+def _subset_analysis_path(rng: random.Random) -> str:
+    treatment, condition = rng.choice(SUBSET_FILTERS)
+    time_point = rng.choice(TIME_POINTS)
+    sample_type = rng.choice(SAMPLE_TYPES)
+    return (
+        f"/analysis_results/subset_analysis/"
+        f"{treatment}/{condition}/{time_point}/{sample_type}"
+    )
+
+
+ROUTE_BUILDERS = {
+    "relative_cell_frequency": _relative_cell_frequency_path,
+    "boxplot_stats": _boxplot_stats_path,
+    "subset_analysis": _subset_analysis_path,
+}
+
+
+def _build_schedule(weights: dict, n: int, seed: int) -> list:
+    """
+    Pre-draw the (route, path) sequence so every configuration replays identical traffic.
+    """
+    rng = random.Random(seed)
+    routes = list(weights)
+    picks = rng.choices(routes, weights=[weights[r] for r in routes], k=n)
+    return [(route, ROUTE_BUILDERS[route](rng)) for route in picks]
+
+
+def _run_load(client_factory, schedule: list, concurrency: int) -> tuple:
+    """
+    Issue the scheduled requests from `concurrency` closed-loop client threads.
+
+    Returns the per-request records (route, latency seconds, ok) and the wall time.
+    """
+    cursor = iter(range(len(schedule)))
+    lock = threading.Lock()
+    records = []
+
+    def worker():
+        local = []
+        with client_factory() as client:
+            while True:
+                with lock:
+                    idx = next(cursor, None)
+                if idx is None:
+                    break
+                route, path = schedule[idx]
+                start = time.perf_counter()
+                try:
+                    ok = client.get(path).status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                local.append((route, time.perf_counter() - start, ok))
+        with lock:
+            records.extend(local)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return records, time.perf_counter() - start
+
+
+def _summarize(records: list, wall_time: float) -> dict:
+    latencies = np.array([r[1] for r in records]) * 1000
+    errors = sum(1 for r in records if not r[2])
+    summary = {
+        "requests": len(records),
+        "requests_per_s": round(len(records) / wall_time, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p90_ms": round(float(np.percentile(latencies, 90)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "max_ms": round(float(latencies.max()), 2),
+        "error_rate": round(errors / len(records), 4),
+        "routes": {},
+    }
+    for route in sorted({r[0] for r in records}):
+        route_lat = np.array([r[1] for r in records if r[0] == route]) * 1000
+        route_err = sum(1 for r in records if r[0] == route and not r[2])
+        summary["routes"][route] = {
+            "requests": len(route_lat),
+            "p50_ms": round(float(np.percentile(route_lat, 50)), 2),
+            "p99_ms": round(float(np.percentile(route_lat, 99)), 2),
+            "error_rate": round(route_err / len(route_lat), 4),
+        }
+    return summary
+
+
+def _wait_for_ready(base_url: str, proc: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise TimeoutError(f"API at {base_url} did not become ready in {timeout}s")
+
+
+def _launch_uvicorn(host: str, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, env.get("PYTHONPATH")]))
+    cmd = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "rest.service:app",
+        "--host",
+        host,
+        "--port",
+        str(port),
+        "--workers",
+        str(workers),
+        "--log-level",
+        "warning",
+    ]
+    _logger.info(f"Launching: {' '.join(cmd)}")
+    return subprocess.Popen(cmd, cwd=ROOT_DIR, env=env)
+
+
+def _run_inprocess(args, schedule: list, warmup: list) -> list:
+    from fastapi.testclient import TestClient
+    from rest.service import app
+
+    reports = []
+    # Entering the TestClient runs the app lifespan; threads share its event loop portal
+    with TestClient(app) as shared_client:
+
+        class _SharedClient:
+            def __enter__(self):
+                return shared_client
+
+            def __exit__(self, *exc):
+                return False
+
+        for concurrency in args.concurrency:
+            _run_load(_SharedClient, warmup, concurrency)
+            records, wall_time = _run_load(_SharedClient, schedule, concurrency)
+            report = {"mode": "inprocess", "workers": 1, "concurrency": concurrency}
+            report.update(_summarize(records, wall_time))
+            reports.append(report)
+            _log_report(report)
+    return reports
+
+
+def _run_uvicorn(args, schedule: list, warmup: list) -> list:
+    base_url = f"http://{args.host}:{args.port}"
+    reports = []
+    for workers in args.workers:
+        proc = _launch_uvicorn(args.host, args.port, workers)
+        try:
+            _wait_for_ready(base_url, proc)
+            for concurrency in args.concurrency:
+
+                def client_factory():
+                    return httpx.Client(base_url=base_url, timeout=60.0)
+
+                _run_load(client_factory, warmup, concurrency)
+                records, wall_time = _run_load(client_factory, schedule, concurrency)
+                report = {
+                    "mode": "uvicorn",
+                    "workers": workers,
+                    "concurrency": concurrency,
+                }
+                report.update(_summarize(records, wall_time))
+                reports.append(report)
+                _log_report(report)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+    return reports
+
+
+def _log_report(report: dict):
+    _logger.info(
+        f"[{report['mode']} workers={report['workers']} concurrency={report['concurrency']}] "
+        f"{report['requests_per_s']} req/s, p50={report['p50_ms']}ms "
+        f"p90={report['p90_ms']}ms p99={report['p99_ms']}ms max={report['max_ms']}ms "
+        f"errors={report['error_rate']:.2%}"
+    )
+    for route, stats in report["routes"].items():
+        _logger.info(
+            f"    {route}: n={stats['requests']} p50={stats['p50_ms']}ms "
+            f"p99={stats['p99_ms']}ms errors={stats['error_rate']:.2%}"
+        )
+
+
+if __name__ == "__main__":
+    args = _arg_parse()
+
+    weights = _parse_mix(args.mix)
+    schedule = _build_schedule(weights, args.requests, args.seed)
+    warmup = _build_schedule(weights, args.warmup, args.seed + 1)
+
+    if args.mode == "inprocess":
+        reports = _run_inprocess(args, schedule, warmup)
+    else:
+        reports = _run_uvicorn(args, schedule, warmup)
+
+    if args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump(reports, f, indent=2)
+        _logger.info(f"Wrote report to {args.output_json}")
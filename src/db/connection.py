@@ -1,13 +1,25 @@
 """
-Database connection module. Currently supports DuckDB.
+Database connection module. Serves DuckDB files, in-memory copies of them, or SQLite
+replicas of them.
 """
 
 from abc import ABC, abstractmethod
+from contextlib import closing, contextmanager
+from db.constant import SchemaNames
+from db.profiling import SlowQueryLog
+from db.sqlite_replica import build_sqlite_replica, connect_sqlite_replica
 from pathlib import Path
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 
+import contextvars
 import duckdb
+import logging
+import os
 import pandas as pd
+import threading
+
+_logger = logging.getLogger(__name__)
 
 
 # Abstract base class for DB connections
@@ -25,29 +37,186 @@ class DBConn(ABC):
         pass
 
 
-class DuckDBConn(DBConn):
-    def __init__(self, database=":memory:", read_only=False):
+class VersionedEngineConn(DBConn):
+    """
+    Connection serving SQLAlchemy engines for the database version `database` currently
+    resolves to. Subclasses build the engine of one version in `_create_engine`.
+    """
+
+    def __init__(self, database, slow_query_ms=None, slow_query_log=None):
+        self.database = database
+        self._engine = None
+        self._engine_target = None
+        self._engine_lock = threading.Lock()
+        # Version whose engine is being built in the background, if any
+        self._building = None
+        # Active pin count per engine; replaced engines stay open until their last pin ends
+        self._engine_pins = {}
+        self._pinned = contextvars.ContextVar(f"pinned_engine_{id(self)}", default=None)
+        self.slow_queries = (
+            SlowQueryLog(slow_query_ms, log_path=slow_query_log)
+            if slow_query_ms is not None
+            else None
+        )
+
+    @abstractmethod
+    def _create_engine(self, target: str) -> Engine:
+        pass
+
+    def _dispose_engine(self, engine: Engine) -> None:
+        engine.dispose()
+
+    def close(self):
+        # A background build finishing after this disposes its engine instead
+        self._building = None
+        if self._engine:
+            self._dispose_engine(self._engine)
+            self._engine = None
+
+    @property
+    def version(self) -> str:
+        """
+        Identifier of the database version currently served. When `database` is a symlink
+        published by the loader, this is the name of the versioned file it points to.
+        """
+        pinned = self._pinned.get()
+        if pinned is not None:
+            return os.path.basename(pinned[1])
+        return os.path.basename(self._resolve_database())
+
+    def _resolve_database(self) -> str:
+        if self.database == ":memory:":
+            return self.database
+        return os.path.realpath(self.database)
+
+    def _install_engine(self, engine: Engine, target: str) -> None:
+        # Caller holds self._engine_lock
+        previous = self._engine
+        self._engine = engine
+        self._engine_target = target
+        if self.slow_queries is not None:
+            self.slow_queries.attach(engine)
+        if previous and not self._engine_pins.get(previous):
+            self._dispose_engine(previous)
+
+    def _build_engine(self, target: str) -> None:
+        try:
+            engine = self._create_engine(target)
+            # Initialise the dialect before requests share the engine
+            engine.connect().close()
+        except Exception:
+            _logger.exception(
+                f"Building the engine of {target} failed, "
+                f"still serving {self._engine_target}"
+            )
+            with self._engine_lock:
+                if self._building == target:
+                    self._building = None
+            return
+        with self._engine_lock:
+            if self._building != target:
+                # Closed, or a newer version was published while building
+                self._dispose_engine(engine)
+                return
+            self._building = None
+            self._install_engine(engine, target)
+
+    def _refresh_engine(self):
+        # Caller holds self._engine_lock
+        target = self._resolve_database()
+        if not self._engine:
+            self._install_engine(self._create_engine(target), target)
+        elif target != self._engine_target and target != self._building:
+            # Building a version can mean copying the whole analysis schema (in-memory
+            # DuckDB, SQLite), so it runs in the background and requests keep using the
+            # current version until the new engine is swapped in
+            self._building = target
+            threading.Thread(
+                target=self._build_engine, args=(target,), daemon=True
+            ).start()
+        return self._engine
+
+    def sqlalchemy_engine(self):
+        """
+        Returns a SQLAlchemy engine for the database version currently published.
+
+        The engine is bound to the file `database` currently resolves to. When a new
+        version is published behind the symlink, the next call starts building an engine
+        on the new file in the background; new work moves over once it is ready, while
+        pinned blocks finish on the old one.
+        """
+        pinned = self._pinned.get()
+        if pinned is not None:
+            return pinned[0]
+        # Concurrent first requests must not build the engine twice; duckdb-engine's
+        # dialect initialisation deadlocks when run from several threads at once.
+        with self._engine_lock:
+            return self._refresh_engine()
+
+    def acquire_pin(self) -> tuple[Engine, str]:
+        """
+        Pin the engine of the version currently served, for `pin_version`. It can block
+        on the first engine build, so async callers run it in a thread.
+        """
+        with self._engine_lock:
+            engine = self._refresh_engine()
+            target = self._engine_target
+            self._engine_pins[engine] = self._engine_pins.get(engine, 0) + 1
+        return engine, target
+
+    @contextmanager
+    def pin_version(self, pin: tuple[Engine, str] | None = None):
+        """
+        Serve every query issued in the block from the database version current at entry,
+        or from `pin`, as returned by `acquire_pin`, which the block then releases.
+
+        A request that runs several queries therefore never mixes two versions, and the
+        engine of a replaced version is only disposed once its last pinned block exits.
+        Yields the pinned version identifier.
+        """
+        if self._pinned.get() is not None:
+            yield self.version
+            return
+
+        engine, target = pin or self.acquire_pin()
+        token = self._pinned.set((engine, target))
+        try:
+            yield os.path.basename(target)
+        finally:
+            self._pinned.reset(token)
+            with self._engine_lock:
+                self._engine_pins[engine] -= 1
+                if not self._engine_pins[engine]:
+                    del self._engine_pins[engine]
+                    if engine is not self._engine:
+                        self._dispose_engine(engine)
+
+
+class DuckDBConn(VersionedEngineConn):
+    def __init__(
+        self,
+        database=":memory:",
+        read_only=False,
+        slow_query_ms=None,
+        slow_query_log=None,
+    ):
         """
         params:
             database: Path to the DuckDB file or ':memory:'.
             read_only: Open DB in read-only mode if True.
+            slow_query_ms: If set, profile SQLAlchemy statements slower than this.
+            slow_query_log: Rotating JSON-lines log of the slow statements.
         """
-        self.database = database
+        super().__init__(database, slow_query_ms, slow_query_log)
         self._read_only = read_only
         self._conn = None
-        self._engine = None
 
     def __enter__(self):
         self._conn = duckdb.connect(database=self.database, read_only=self._read_only)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self._conn:
-            self._conn.close()
-            self._conn = None
-        if self._engine:
-            self._engine.dispose()
-            self._engine = None
+        self.close()
 
     def connect(self):
         if not self._conn:
@@ -60,9 +229,7 @@ class DuckDBConn(DBConn):
         if self._conn:
             self._conn.close()
             self._conn = None
-        if self._engine:
-            self._engine.dispose()
-            self._engine = None
+        super().close()
 
     def execute(
         self, query: str, params: dict | None = None, ddl: bool = False
@@ -85,21 +252,137 @@ class DuckDBConn(DBConn):
         sql = Path(filepath).read_text()
         return self.execute(sql, params=params, ddl=ddl)
 
-    def sqlalchemy_engine(self):
+    def _create_engine(self, target: str) -> Engine:
+        connect_args = {}
+        if target != ":memory:":
+            connect_args["read_only"] = self._read_only
+        return create_engine(f"duckdb:///{target}", connect_args=connect_args)
+
+
+class InMemoryDuckDBConn(DuckDBConn):
+    """
+    DuckDB connection serving from an in-memory copy of the analysis schema.
+
+    Each published version is copied into a named in-memory database when it is first
+    served, so queries never read the file. The whole analysis schema has to fit in
+    memory, once per worker process.
+    """
+
+    def __init__(self, database, slow_query_ms=None, slow_query_log=None):
+        super().__init__(
+            database,
+            read_only=True,
+            slow_query_ms=slow_query_ms,
+            slow_query_log=slow_query_log,
+        )
+        self._keepers = {}
+
+    def _create_engine(self, target: str) -> Engine:
+        engine = create_engine(f"duckdb:///:memory:{os.path.basename(target)}")
+        # The named in-memory database lives as long as one of its connections does, so
+        # one is held until the engine is disposed. It is opened through the engine, as
+        # DuckDB only shares a database between connections of the same configuration.
+        keeper = engine.raw_connection()
+        copy = keeper.driver_connection
+        copy.execute(f"ATTACH '{target}' AS source (READ_ONLY)")
+        copy.execute(f"CREATE SCHEMA IF NOT EXISTS {SchemaNames.ANALYSIS}")
+        tables = copy.execute(
+            # Views included: with partitioned storage the frequency tables are views
+            "SELECT table_name FROM information_schema.tables "
+            "WHERE table_catalog = 'source' AND table_schema = ?",
+            [SchemaNames.ANALYSIS],
+        ).fetchall()
+        for (table,) in tables:
+            copy.execute(
+                f"CREATE OR REPLACE TABLE {SchemaNames.ANALYSIS}.{table} AS "
+                f"FROM source.{SchemaNames.ANALYSIS}.{table}"
+            )
+        copy.execute("DETACH source")
+        self._keepers[engine] = keeper
+        return engine
+
+    def _dispose_engine(self, engine: Engine) -> None:
+        keeper = self._keepers.pop(engine, None)
+        if keeper is not None:
+            keeper.close()
+        super()._dispose_engine(engine)
+
+
+class SQLiteConn(VersionedEngineConn):
+    def __init__(
+        self,
+        database,
+        replica_dir=None,
+        slow_query_ms=None,
+        slow_query_log=None,
+    ):
         """
-        Returns a SQLAlchemy engine using duckdb-engine.
+        Serve from SQLite replicas of the DuckDB versions the loader publishes.
+
+        params:
+            database: Path to the published DuckDB file (symlink) the replicas copy.
+            replica_dir: Directory of the replicas. Defaults to 'replicas' next to
+                `database`.
+            slow_query_ms: If set, log SQLAlchemy statements slower than this.
+            slow_query_log: Rotating JSON-lines log of the slow statements.
         """
-        if not self._engine:
-            conn_str = f"duckdb:///{self.database}"
-            self._engine = create_engine(conn_str)
-        return self._engine
+        super().__init__(database, slow_query_ms, slow_query_log)
+        self.replica_dir = replica_dir or os.path.join(
+            os.path.dirname(os.path.abspath(database)), "replicas"
+        )
+
+    def connect(self):
+        return connect_sqlite_replica(
+            build_sqlite_replica(self._resolve_database(), self.replica_dir)
+        )
+
+    def execute(self, query: str, params=None) -> pd.DataFrame:
+        with closing(self.connect()) as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+    def _create_engine(self, target: str) -> Engine:
+        path = build_sqlite_replica(target, self.replica_dir)
+        return create_engine("sqlite://", creator=lambda: connect_sqlite_replica(path))
+
+
+def publish_database(database_file: str, link_path: str) -> None:
+    """
+    Atomically point `link_path` at `database_file`.
+
+    A temporary symlink is renamed over `link_path`, so readers resolving the link see
+    either the previous version or the new one, never a partially written file.
+    """
+    target = os.path.relpath(database_file, os.path.dirname(os.path.abspath(link_path)))
+    tmp_link = f"{link_path}.{os.getpid()}.tmp"
+    os.symlink(target, tmp_link)
+    os.replace(tmp_link, link_path)
 
 
 def create_db_connection(config: dict) -> DBConn:
     db_type = config.get("db_type", "").lower()
+    slow_query_ms = config.get("slow_query_ms")
+    slow_query_log = config.get("slow_query_log")
     if db_type == "duckdb":
         database = config.get("database", ":memory:")
         read_only = config.get("read_only", False)
-        return DuckDBConn(database=database, read_only=read_only)
+        return DuckDBConn(
+            database=database,
+            read_only=read_only,
+            slow_query_ms=slow_query_ms,
+            slow_query_log=slow_query_log,
+        )
+    elif db_type == "duckdb_memory":
+        return InMemoryDuckDBConn(
+            database=config["database"],
+            slow_query_ms=slow_query_ms,
+            slow_query_log=slow_query_log,
+        )
+    elif db_type == "sqlite":
+        return SQLiteConn(
+            database=config["database"],
+            replica_dir=config.get("replica_dir"),
+            slow_query_ms=slow_query_ms,
+            slow_query_log=slow_query_log,
+        )
     else:
         raise ValueError(f"Unsupported database type: {db_type}")
@@ -4,10 +4,13 @@ class TableNames:
     """
 
     RELATIVE_CELL_FREQUENCY = "relative_cell_frequency"
+    RCF_ENRICHED = "rcf_enriched"
     PROJECT = "project"
     SAMPLE_COUNT = "sample_cell_count"
     SAMPLE = "sample"
     SUBJECT = "subject"
+    SUBSET_ANALYSIS_CUBE = "subset_analysis_cube"
+    MODEL_RESULTS = "model_results"
 
 
 class SchemaNames:
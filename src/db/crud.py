@@ -1,18 +1,263 @@
 from db.connection import create_db_connection, DBConn
 from db.constant import SchemaNames, TableNames
-from sqlalchemy import func, MetaData, select, Table
+from db.profiling import tag_queries
+from inspect import signature
+from sqlalchemy import (
+    and_,
+    bindparam,
+    Enum,
+    func,
+    inspect,
+    Integer,
+    MetaData,
+    or_,
+    select,
+    String,
+    Table,
+    TypeDecorator,
+)
 from sqlalchemy.engine import Engine
-from typing import Optional
+from typing import Iterator, Optional, TYPE_CHECKING
 
+import functools
 import inject
 import os
 import pandas as pd
-import inject
-import os
+import threading
+import weakref
 import yaml
 
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+_engine_cache_lock = threading.RLock()
+_engine_caches = weakref.WeakKeyDictionary()
+
+
+def _profiled(fetch):
+    """
+    Tag the statements `fetch` issues with its name and arguments, so the slow query log
+    can attribute them.
+    """
+    fetch_signature = signature(fetch)
+
+    @functools.wraps(fetch)
+    def wrapper(*args, **kwargs):
+        bound = fetch_signature.bind_partial(*args, **kwargs)
+        params = {k: v for k, v in bound.arguments.items() if k != "conn"}
+        with tag_queries(fetch.__name__, params):
+            return fetch(*args, **kwargs)
+
+    return wrapper
+
+
+def _engine_cache(engine: Engine) -> dict:
+    """
+    Cache scoped to one engine, i.e. one database version. Entries disappear together
+    with the engine once a newer version has been published and the old one is released.
+    """
+    with _engine_cache_lock:
+        cache = _engine_caches.get(engine)
+        if cache is None:
+            cache = _engine_caches[engine] = {}
+        return cache
+
+
+class _EnumLabel(TypeDecorator):
+    """
+    String column backed by a DuckDB ENUM. Frames built by `_fetch_frame` hold these
+    columns as `pd.Categorical`.
+    """
+
+    impl = String
+    cache_ok = True
+
+
+def _enum_as_label(inspector, table, column_info) -> None:
+    """
+    duckdb-engine reflects DuckDB ENUM columns as a SQLAlchemy Enum without its labels,
+    which then rejects every value it reads back. The database enforces the labels, so
+    read them as strings and remember the column was an ENUM.
+    """
+    if isinstance(column_info["type"], Enum):
+        column_info["type"] = _EnumLabel()
+
+
+class _CompiledSelect:
+    """
+    A select compiled to SQL once, executed with its named bind parameters.
+
+    duckdb-engine opts out of SQLAlchemy's compiled statement cache, so executing a
+    select expression recompiles it on every call.
+    """
+
+    def __init__(self, stmt, engine: Engine):
+        compiled = stmt.compile(engine)
+        self.sql = compiled.string
+        self.positional = compiled.positional
+        self.positions = compiled.positiontup
+        # Values of the literals compiled as anonymous bind parameters
+        self.defaults = compiled.params
+        self.selected_columns = stmt.selected_columns
+
+    def execute(self, connection, **params):
+        values = {**self.defaults, **params}
+        if self.positional:
+            values = tuple(values[name] for name in self.positions)
+        return connection.exec_driver_sql(self.sql, values)
+
+
+_select_builders = {}
+
+
+def _select_builder(name: str):
+    """
+    Register a function building the select `name` from a DBConn.
+    """
+
+    def register(build):
+        _select_builders[name] = build
+        return build
+
+    return register
+
+
+def _compiled_select(conn: DBConn, name: str) -> tuple[Engine, _CompiledSelect]:
+    """
+    Build and compile the select `name` once per engine, i.e. once per database version.
+    """
+    engine = conn.sqlalchemy_engine()
+    with _engine_cache_lock:
+        selects = _engine_cache(engine).setdefault("compiled_selects", {})
+        if name not in selects:
+            selects[name] = _CompiledSelect(_select_builders[name](conn), engine)
+        return engine, selects[name]
+
+
+def _fetch_frame(connection, stmt: _CompiledSelect, **params) -> pd.DataFrame:
+    """
+    Execute `stmt` into a DataFrame, turning ENUM-backed columns into categoricals so
+    group-bys and equality masks downstream compare integer codes instead of strings.
+    """
+    result = stmt.execute(connection, **params)
+    df = pd.DataFrame(result.fetchall(), columns=result.keys())
+    for name, column in zip(result.keys(), stmt.selected_columns):
+        if isinstance(column.type, _EnumLabel):
+            df[name] = df[name].astype("category")
+    return df
+
+
+def _reflect_tables(conn: DBConn, *table_names: str) -> tuple[Engine, list[Table]]:
+    """
+    Reflect analysis tables once per engine, i.e. once per database version.
+
+    Reflection issues several catalog queries per table, which used to dominate the cost of
+    every request. Tables referenced by foreign keys are not reflected along, since they
+    would miss the ENUM listener.
+    """
+    engine = conn.sqlalchemy_engine()
+    with _engine_cache_lock:
+        metadata = _engine_cache(engine).setdefault("metadata", MetaData())
+        tables = [
+            Table(
+                name,
+                metadata,
+                autoload_with=engine,
+                schema=SchemaNames.ANALYSIS,
+                listeners=[("column_reflect", _enum_as_label)],
+                resolve_fks=False,
+            )
+            for name in table_names
+        ]
+    return engine, tables
+
+
+def _has_table(engine: Engine, table_name: str) -> bool:
+    with _engine_cache_lock:
+        cache = _engine_cache(engine).setdefault("has_table", {})
+        if table_name not in cache:
+            cache[table_name] = inspect(engine).has_table(
+                table_name, schema=SchemaNames.ANALYSIS
+            )
+        return cache[table_name]
+
+
+def _frequency_source(conn: DBConn):
+    """
+    Relative cell frequencies together with the sample and subject attributes to filter on.
+
+    Reads the denormalized rcf_enriched table when the database has one, so hot queries
+    scan a single table, and falls back to joining relative_cell_frequency ⋈ sample ⋈
+    subject otherwise. Returns the engine, the FROM clause, and the column collections to
+    use for relative frequency, sample and subject columns.
+    """
+    engine, (rcf, sp, subj) = _reflect_tables(
+        conn, TableNames.RELATIVE_CELL_FREQUENCY, TableNames.SAMPLE, TableNames.SUBJECT
+    )
+    if _has_table(engine, TableNames.RCF_ENRICHED):
+        _, (wide,) = _reflect_tables(conn, TableNames.RCF_ENRICHED)
+        return engine, wide, wide.c, wide.c, wide.c
+
+    joined = rcf.join(sp, rcf.c.sample == sp.c.sample).join(
+        subj, sp.c.subject == subj.c.subject
+    )
+    return engine, joined, rcf.c, sp.c, subj.c
+
+
+_HOT_SELECTS = (
+    "relative_cell_frequency",
+    "relative_cell_frequency_filtered",
+    "boxplot_data",
+    "paired_timepoints",
+    "histograms",
+    "outliers",
+    "subset_samples_per_project",
+    "subset_subjects_by_response",
+    "subset_subjects_by_sex",
+)
+
+
+def warm_metadata_cache(conn: DBConn) -> None:
+    """
+    Reflect every analysis table used by the crud functions and compile their hot
+    selects ahead of the first request.
+    """
+    _frequency_source(conn)
+    _load_subset_analysis_cube(conn)
+    for name in _HOT_SELECTS:
+        _compiled_select(conn, name)
+
+
+@_select_builder("relative_cell_frequency")
+def _relative_cell_frequency_select(conn: DBConn):
+    _, (rcf,) = _reflect_tables(conn, TableNames.RELATIVE_CELL_FREQUENCY)
+    # Backs the paginated route; the physical order follows the dashboard filters instead
+    return select(rcf).order_by(rcf.c.sample, rcf.c.population)
+
+
+@_select_builder("relative_cell_frequency_filtered")
+def _relative_cell_frequency_filtered_select(conn: DBConn):
+    _, (rcf,) = _reflect_tables(conn, TableNames.RELATIVE_CELL_FREQUENCY)
+    _, source, rcf_c, sp_c, subj_c = _frequency_source(conn)
+    return (
+        select(
+            *(rcf_c[name] for name in rcf.c.keys()),
+            subj_c.response,
+            sp_c.time_from_treatment_start,
+        )
+        .select_from(source)
+        .where(
+            sp_c.sample_type == "PBMC",
+            sp_c.time_from_treatment_start == bindparam("time_from_treatment_start"),
+            subj_c.response.is_not(None),
+            subj_c.condition == "melanoma",
+            subj_c.treatment == "miraclib",
+        )
+    )
+
 
 @inject.params(conn=DBConn)
+@_profiled
 def fetch_relative_cell_frequency(
     conn: DBConn,
     additional_filters: bool = False,
@@ -26,74 +271,69 @@ def fetch_relative_cell_frequency(
         additional_filters: If True, apply melanoma PBMC filtering with joins
         time_from_treatment_start: If set, only include this timepoint
     """
-    engine = conn.sqlalchemy_engine()
-    metadata = MetaData()
-
-    rcf = Table(
-        TableNames.RELATIVE_CELL_FREQUENCY,
-        metadata,
-        autoload_with=engine,
-        schema=SchemaNames.ANALYSIS,
-    )
     if additional_filters and time_from_treatment_start is not None:
-        sp = Table(
-            TableNames.SAMPLE,
-            metadata,
-            autoload_with=engine,
-            schema=SchemaNames.ANALYSIS,
-        )
-        subj = Table(
-            TableNames.SUBJECT,
-            metadata,
-            autoload_with=engine,
-            schema=SchemaNames.ANALYSIS,
-        )
-
-        stmt = (
-            select(rcf, subj.c.response, sp.c.time_from_treatment_start)
-            .select_from(
-                rcf.join(sp, rcf.c.sample == sp.c.sample).join(
-                    subj, sp.c.subject == subj.c.subject
-                )
-            )
-            .where(
-                sp.c.sample_type == "PBMC",
-                sp.c.time_from_treatment_start == time_from_treatment_start,
-                subj.c.response.is_not(None),
-                subj.c.condition == "melanoma",
-                subj.c.treatment == "miraclib",
-            )
-        )
+        engine, stmt = _compiled_select(conn, "relative_cell_frequency_filtered")
+        params = {"time_from_treatment_start": time_from_treatment_start}
     else:
-        stmt = select(rcf)
+        engine, stmt = _compiled_select(conn, "relative_cell_frequency")
+        params = {}
     with engine.connect() as connection:
-        result = connection.execute(stmt)
-        return pd.DataFrame(result.fetchall(), columns=result.keys())
+        return _fetch_frame(connection, stmt, **params)
 
 
 @inject.params(conn=DBConn)
-def fetch_boxplot_data(conn: DBConn, time_from_treatment_start: int) -> pd.DataFrame:
+def stream_stats_test_data(
+    conn: DBConn,
+    time_from_treatment_start: int,
+    value_col: str = "percentage",
+    batch_rows: int = 65536,
+) -> Iterator["pa.RecordBatch"]:
     """
-    Fetch box plot data for relative cell frequency analysis. Comparing responder vs non-responder
-    for five major immune cell populations in PBMC samples from melanoma patients.
+    Stream the rows behind the statistical tests, i.e. the filtered branch of
+    `fetch_relative_cell_frequency`, as Arrow record batches of at most `batch_rows`
+    rows, so the full result never has to fit in memory at once. Only the columns the
+    tests need are read.
     """
-    engine = conn.sqlalchemy_engine()
-    metadata = MetaData()
-
-    rcf = Table(
-        TableNames.RELATIVE_CELL_FREQUENCY,
-        metadata,
-        autoload_with=engine,
-        schema=SchemaNames.ANALYSIS,
-    )
-    sp = Table(
-        TableNames.SAMPLE, metadata, autoload_with=engine, schema=SchemaNames.ANALYSIS
-    )
-    subj = Table(
-        TableNames.SUBJECT, metadata, autoload_with=engine, schema=SchemaNames.ANALYSIS
+    engine, source, rcf_c, sp_c, subj_c = _frequency_source(conn)
+    stmt = (
+        select(
+            sp_c.time_from_treatment_start,
+            rcf_c.population,
+            subj_c.response,
+            rcf_c[value_col],
+        )
+        .select_from(source)
+        .where(
+            sp_c.sample_type == "PBMC",
+            sp_c.time_from_treatment_start == time_from_treatment_start,
+            subj_c.response.is_not(None),
+            subj_c.condition == "melanoma",
+            subj_c.treatment == "miraclib",
+        )
     )
+    sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+
+    with engine.connect() as connection:
+        if engine.dialect.name != "duckdb":
+            import pyarrow as pa
+
+            result = connection.exec_driver_sql(sql)
+            while rows := result.fetchmany(batch_rows):
+                yield pa.RecordBatch.from_pylist([row._asdict() for row in rows])
+            return
+
+        # Arrow batches are only exposed by the DuckDB connection underneath SQLAlchemy
+        reader = connection.connection.driver_connection.execute(
+            sql
+        ).fetch_record_batch(batch_rows)
+        yield from reader
+
 
-    percentage = rcf.c.percentage
+@_select_builder("boxplot_data")
+def _boxplot_data_select(conn: DBConn):
+    _, source, rcf_c, sp_c, subj_c = _frequency_source(conn)
+
+    percentage = rcf_c.percentage
     q25 = func.quantile_cont(percentage, 0.25)
     q50 = func.median(percentage)
     q75 = func.quantile_cont(percentage, 0.75)
@@ -101,11 +341,11 @@ def fetch_boxplot_data(conn: DBConn, time_from_treatment_start: int) -> pd.DataF
     lower_whisker = q25 - 1.5 * iqr
     upper_whisker = q75 + 1.5 * iqr
 
-    stmt = (
+    return (
         select(
-            rcf.c.population,
-            subj.c.response,
-            sp.c.time_from_treatment_start,
+            rcf_c.population,
+            subj_c.response,
+            sp_c.time_from_treatment_start,
             func.round(func.avg(percentage), 3).label("avg_percentage"),
             func.round(q25, 3).label("q1"),
             func.round(q50, 3).label("median"),
@@ -114,27 +354,301 @@ def fetch_boxplot_data(conn: DBConn, time_from_treatment_start: int) -> pd.DataF
             func.round(lower_whisker, 3).label("lower_whisker"),
             func.round(upper_whisker, 3).label("upper_whisker"),
         )
+        .select_from(source)
+        .where(
+            sp_c.sample_type == "PBMC",
+            sp_c.time_from_treatment_start == bindparam("time_from_treatment_start"),
+            subj_c.treatment == "miraclib",
+            subj_c.response.is_not(None),
+            subj_c.condition == "melanoma",
+        )
+        .group_by(rcf_c.population, subj_c.response, sp_c.time_from_treatment_start)
+    )
+
+
+@inject.params(conn=DBConn)
+@_profiled
+def fetch_boxplot_data(conn: DBConn, time_from_treatment_start: int) -> pd.DataFrame:
+    """
+    Fetch box plot data for relative cell frequency analysis. Comparing responder vs non-responder
+    for five major immune cell populations in PBMC samples from melanoma patients.
+    """
+    engine, stmt = _compiled_select(conn, "boxplot_data")
+    with engine.connect() as connection:
+        return _fetch_frame(
+            connection, stmt, time_from_treatment_start=time_from_treatment_start
+        )
+
+
+@inject.params(conn=DBConn)
+@_profiled
+def fetch_paired_timepoints(
+    conn: DBConn,
+    time_from_treatment_start: int,
+    baseline_time_from_treatment_start: int = 0,
+) -> pd.DataFrame:
+    """
+    Fetch each subject's relative frequencies at a baseline and a follow-up timepoint, one
+    row per (subject, population), for PBMC samples from melanoma patients treated with
+    miraclib.
+
+    The pivot across time_from_treatment_start runs in the database as conditional
+    aggregates, so only subjects sampled at both timepoints reach pandas.
+    """
+    engine, stmt = _compiled_select(conn, "paired_timepoints")
+    with engine.connect() as connection:
+        return _fetch_frame(
+            connection,
+            stmt,
+            time_from_treatment_start=time_from_treatment_start,
+            baseline_time_from_treatment_start=baseline_time_from_treatment_start,
+        )
+
+
+@_select_builder("paired_timepoints")
+def _paired_timepoints_select(conn: DBConn):
+    _, source, rcf_c, sp_c, subj_c = _frequency_source(conn)
+
+    timepoint = sp_c.time_from_treatment_start
+    baseline = bindparam("baseline_time_from_treatment_start")
+    followup = bindparam("time_from_treatment_start")
+    baseline_value = func.avg(rcf_c.percentage).filter(timepoint == baseline)
+    followup_value = func.avg(rcf_c.percentage).filter(timepoint == followup)
+
+    return (
+        select(
+            sp_c.subject,
+            rcf_c.population,
+            subj_c.response,
+            baseline_value.label("baseline_value"),
+            followup_value.label("followup_value"),
+        )
+        .select_from(source)
+        .where(
+            sp_c.sample_type == "PBMC",
+            timepoint.in_([baseline, followup]),
+            subj_c.treatment == "miraclib",
+            subj_c.response.is_not(None),
+            subj_c.condition == "melanoma",
+        )
+        .group_by(sp_c.subject, rcf_c.population, subj_c.response)
+        .having(baseline_value.is_not(None), followup_value.is_not(None))
+    )
+
+
+@inject.params(conn=DBConn)
+@_profiled
+def fetch_histograms(
+    conn: DBConn, time_from_treatment_start: int, bins: int = 50
+) -> pd.DataFrame:
+    """
+    Fetch a histogram of relative frequencies per (population, response) over `bins`
+    equal-width bins spanning 0-100%, for the samples behind `fetch_boxplot_data`.
+
+    Only non-empty bins are returned, so the result has at most `bins` rows per group
+    however many samples the cohort has.
+    """
+    engine, stmt = _compiled_select(conn, "histograms")
+    with engine.connect() as connection:
+        return _fetch_frame(
+            connection,
+            stmt,
+            time_from_treatment_start=time_from_treatment_start,
+            bins=bins,
+        )
+
+
+@_select_builder("histograms")
+def _histograms_select(conn: DBConn):
+    _, source, rcf_c, sp_c, subj_c = _frequency_source(conn)
+
+    bins = bindparam("bins", type_=Integer)
+    # 100% falls into the last bin rather than one of its own
+    bin_index = func.least(func.floor(rcf_c.percentage * bins / 100.0), bins - 1)
+    binned = (
+        select(
+            rcf_c.population,
+            subj_c.response,
+            sp_c.time_from_treatment_start,
+            bin_index.cast(Integer).label("bin"),
+        )
+        .select_from(source)
+        .where(
+            sp_c.sample_type == "PBMC",
+            sp_c.time_from_treatment_start == bindparam("time_from_treatment_start"),
+            subj_c.treatment == "miraclib",
+            subj_c.response.is_not(None),
+            subj_c.condition == "melanoma",
+        )
+        .subquery()
+    )
+    group = (binned.c.population, binned.c.response, binned.c.time_from_treatment_start)
+    return (
+        select(*group, binned.c.bin, func.count().label("count"))
+        .group_by(*group, binned.c.bin)
+        .order_by(*group, binned.c.bin)
+    )
+
+
+@inject.params(conn=DBConn)
+@_profiled
+def fetch_outliers(
+    conn: DBConn, time_from_treatment_start: int, top_k: int = 10
+) -> pd.DataFrame:
+    """
+    Fetch the `top_k` samples per (population, response) lying furthest beyond the
+    whiskers returned by `fetch_boxplot_data`, with their distance past the whisker.
+    """
+    engine, stmt = _compiled_select(conn, "outliers")
+    with engine.connect() as connection:
+        return _fetch_frame(
+            connection,
+            stmt,
+            time_from_treatment_start=time_from_treatment_start,
+            top_k=top_k,
+        )
+
+
+@_select_builder("outliers")
+def _outliers_select(conn: DBConn):
+    _, source, rcf_c, sp_c, subj_c = _frequency_source(conn)
+    whiskers = _boxplot_data_select(conn).subquery("whiskers")
+
+    percentage = rcf_c.percentage
+    distance = func.greatest(
+        whiskers.c.lower_whisker - percentage, percentage - whiskers.c.upper_whisker
+    )
+    ranked = (
+        select(
+            rcf_c.population,
+            subj_c.response,
+            sp_c.time_from_treatment_start,
+            rcf_c.sample,
+            percentage,
+            func.round(distance, 3).label("distance"),
+            func.row_number()
+            .over(
+                partition_by=(rcf_c.population, subj_c.response),
+                order_by=distance.desc(),
+            )
+            .label("rank"),
+        )
         .select_from(
-            rcf.join(sp, rcf.c.sample == sp.c.sample).join(
-                subj, sp.c.subject == subj.c.subject
+            source.join(
+                whiskers,
+                and_(
+                    rcf_c.population == whiskers.c.population,
+                    subj_c.response == whiskers.c.response,
+                ),
             )
         )
         .where(
-            sp.c.sample_type == "PBMC",
-            sp.c.time_from_treatment_start == time_from_treatment_start,
-            subj.c.treatment == "miraclib",
-            subj.c.response.is_not(None),
-            subj.c.condition == "melanoma",
+            sp_c.sample_type == "PBMC",
+            sp_c.time_from_treatment_start == bindparam("time_from_treatment_start"),
+            subj_c.treatment == "miraclib",
+            subj_c.response.is_not(None),
+            subj_c.condition == "melanoma",
+            or_(
+                percentage < whiskers.c.lower_whisker,
+                percentage > whiskers.c.upper_whisker,
+            ),
         )
-        .group_by(rcf.c.population, subj.c.response, sp.c.time_from_treatment_start)
+        .subquery()
+    )
+    return (
+        select(*(column for column in ranked.c if column.key != "rank"))
+        .where(ranked.c.rank <= bindparam("top_k", type_=Integer))
+        .order_by(ranked.c.population, ranked.c.response, ranked.c.rank)
+    )
+
+
+@inject.params(conn=DBConn)
+@_profiled
+def fetch_model_results(conn: DBConn) -> pd.DataFrame:
+    """
+    Fetch the mixed effects model results the loader fitted for the database version
+    being served. Databases built without them return an empty frame.
+    """
+    engine = conn.sqlalchemy_engine()
+    if not _has_table(engine, TableNames.MODEL_RESULTS):
+        return pd.DataFrame()
+
+    engine, stmt = _compiled_select(conn, "model_results")
+    with engine.connect() as connection:
+        return _fetch_frame(connection, stmt, dataset_version=conn.version)
+
+
+@_select_builder("model_results")
+def _model_results_select(conn: DBConn):
+    _, (results,) = _reflect_tables(conn, TableNames.MODEL_RESULTS)
+    return (
+        select(results)
+        .where(results.c.dataset_version == bindparam("dataset_version"))
+        .order_by(results.c.population, results.c.term)
     )
 
+
+_SUBSET_FILTER_KEYS = (
+    "treatment",
+    "condition",
+    "time_from_treatment_start",
+    "sample_type",
+)
+
+
+def _empty_subset_analysis() -> dict:
+    return {
+        "samples_per_project": [],
+        "subjects_by_response": [],
+        "subjects_by_sex": [],
+    }
+
+
+def _load_subset_analysis_cube(conn: DBConn) -> Optional[dict]:
+    """
+    Load the precomputed subset analysis cube into a dict keyed by
+    (treatment, condition, time_from_treatment_start, sample_type), once per database
+    version. Returns None if the database was built without the cube.
+    """
+    engine = conn.sqlalchemy_engine()
+    cache = _engine_cache(engine)
+    if "subset_analysis_cube" in cache:
+        return cache["subset_analysis_cube"]
+    if not _has_table(engine, TableNames.SUBSET_ANALYSIS_CUBE):
+        cache["subset_analysis_cube"] = None
+        return None
+
+    _, (cube_table,) = _reflect_tables(conn, TableNames.SUBSET_ANALYSIS_CUBE)
     with engine.connect() as connection:
-        result = connection.execute(stmt)
-        return pd.DataFrame(result.fetchall(), columns=result.keys())
+        rows = connection.execute(select(cube_table)).fetchall()
+
+    cells = {}
+    domains = {key: set() for key in _SUBSET_FILTER_KEYS}
+    for row in rows:
+        key = tuple(getattr(row, name) for name in _SUBSET_FILTER_KEYS)
+        for name, value in zip(_SUBSET_FILTER_KEYS, key):
+            domains[name].add(value)
+        cell = cells.setdefault(key, _empty_subset_analysis())
+        if row.dimension == "project":
+            cell["samples_per_project"].append(
+                {"project": row.project, "sample_count": row.sample_count}
+            )
+        elif row.dimension == "response":
+            cell["subjects_by_response"].append(
+                {"response": row.response, "subject_count": row.subject_count}
+            )
+        elif row.dimension == "sex":
+            cell["subjects_by_sex"].append(
+                {"sex": row.sex, "subject_count": row.subject_count}
+            )
+
+    cube = {"cells": cells, "domains": domains}
+    cache["subset_analysis_cube"] = cube
+    return cube
 
 
 @inject.params(conn=DBConn)
+@_profiled
 def fetch_dynamic_subset_analysis(
     conn: DBConn,
     treatment: str = "miraclib",
@@ -150,67 +664,56 @@ def fetch_dynamic_subset_analysis(
       - Number of samples per project
       - Number of subjects by treatment response
       - Number of subjects by sex
+
+    Filter tuples are answered from the precomputed subset analysis cube with a dict
+    lookup. Filter values the cube has never seen fall back to a live query.
     """
-    engine = conn.sqlalchemy_engine()
-    metadata = MetaData()
+    cube = _load_subset_analysis_cube(conn)
+    key = (treatment, condition, time_from_treatment_start, sample_type)
+    if cube is not None and all(
+        value in cube["domains"][name] for name, value in zip(_SUBSET_FILTER_KEYS, key)
+    ):
+        # Known values whose combination has no samples are absent from the cube
+        return cube["cells"].get(key, _empty_subset_analysis())
 
-    sample = Table(
-        TableNames.SAMPLE, metadata, autoload_with=engine, schema=SchemaNames.ANALYSIS
-    )
-    subject = Table(
-        TableNames.SUBJECT, metadata, autoload_with=engine, schema=SchemaNames.ANALYSIS
+    return _live_subset_analysis(
+        conn, treatment, condition, sample_type, time_from_treatment_start
     )
 
-    joined = sample.join(subject, sample.c.subject == subject.c.subject)
-
-    base_filters = [
-        subject.c.condition == condition,
-        subject.c.treatment == treatment,
-        sample.c.sample_type == sample_type,
-        sample.c.time_from_treatment_start == time_from_treatment_start,
-    ]
-
-    samples_per_project_stmt = (
-        select(sample.c.project, func.count().label("sample_count"))
-        .select_from(joined)
-        .where(*base_filters)
-        .group_by(sample.c.project)
-    )
 
-    response_stmt = (
-        select(
-            subject.c.response,
-            func.count(func.distinct(subject.c.subject)).label("subject_count"),
-        )
-        .select_from(joined)
-        .where(*base_filters)
-        .group_by(subject.c.response)
-    )
-
-    sex_stmt = (
-        select(
-            subject.c.sex,
-            func.count(func.distinct(subject.c.subject)).label("subject_count"),
-        )
-        .select_from(joined)
-        .where(*base_filters)
-        .group_by(subject.c.sex)
+def _live_subset_analysis(
+    conn: DBConn,
+    treatment: str,
+    condition: str,
+    sample_type: str,
+    time_from_treatment_start: int,
+) -> dict:
+    params = {
+        "treatment": treatment,
+        "condition": condition,
+        "sample_type": sample_type,
+        "time_from_treatment_start": time_from_treatment_start,
+    }
+    engine, samples_per_project_stmt = _compiled_select(
+        conn, "subset_samples_per_project"
     )
+    _, response_stmt = _compiled_select(conn, "subset_subjects_by_response")
+    _, sex_stmt = _compiled_select(conn, "subset_subjects_by_sex")
 
     with engine.connect() as conn:
         samples_per_project = [
             {"project": row.project, "sample_count": row.sample_count}
-            for row in conn.execute(samples_per_project_stmt)
+            for row in samples_per_project_stmt.execute(conn, **params)
         ]
 
         subjects_by_response = [
             {"response": row.response, "subject_count": row.subject_count}
-            for row in conn.execute(response_stmt)
+            for row in response_stmt.execute(conn, **params)
         ]
 
         subjects_by_sex = [
             {"sex": row.sex, "subject_count": row.subject_count}
-            for row in conn.execute(sex_stmt)
+            for row in sex_stmt.execute(conn, **params)
         ]
 
     return {
@@ -220,3 +723,55 @@ def fetch_dynamic_subset_analysis(
     }
 
 
+@_select_builder("subset_samples_per_project")
+def _subset_samples_per_project_select(conn: DBConn):
+    _, (sample, subject) = _reflect_tables(conn, TableNames.SAMPLE, TableNames.SUBJECT)
+
+    return (
+        select(sample.c.project, func.count().label("sample_count"))
+        .select_from(sample.join(subject, sample.c.subject == subject.c.subject))
+        .where(
+            subject.c.condition == bindparam("condition"),
+            subject.c.treatment == bindparam("treatment"),
+            sample.c.sample_type == bindparam("sample_type"),
+            sample.c.time_from_treatment_start
+            == bindparam("time_from_treatment_start"),
+        )
+        .group_by(sample.c.project)
+    )
+
+
+def _subset_subjects_select(conn: DBConn, group_column: str):
+    """
+    Subjects per `group_column` value with at least one sample matching the subset keys.
+
+    Subject is the primary key of `subject`, so counting its rows that pass a semi-join
+    with the matching samples equals count(DISTINCT subject) over the sample join,
+    without building a distinct set per group.
+    """
+    _, (sample, subject) = _reflect_tables(conn, TableNames.SAMPLE, TableNames.SUBJECT)
+
+    matching_subjects = select(sample.c.subject).where(
+        sample.c.sample_type == bindparam("sample_type"),
+        sample.c.time_from_treatment_start == bindparam("time_from_treatment_start"),
+    )
+    group = subject.c[group_column]
+    return (
+        select(group, func.count().label("subject_count"))
+        .where(
+            subject.c.condition == bindparam("condition"),
+            subject.c.treatment == bindparam("treatment"),
+            subject.c.subject.in_(matching_subjects),
+        )
+        .group_by(group)
+    )
+
+
+@_select_builder("subset_subjects_by_response")
+def _subset_subjects_by_response_select(conn: DBConn):
+    return _subset_subjects_select(conn, "response")
+
+
+@_select_builder("subset_subjects_by_sex")
+def _subset_subjects_by_sex_select(conn: DBConn):
+    return _subset_subjects_select(conn, "sex")
@@ -0,0 +1,227 @@
+"""
+Slow query log for the SQLAlchemy engines of DBConn.
+
+Statements slower than a threshold are written to a rotating JSON-lines log and aggregated
+per statement shape for the debug endpoint. On DuckDB they are re-run once under
+`EXPLAIN (ANALYZE, FORMAT JSON)` to capture operator-level timings as well.
+"""
+
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from sqlalchemy import event
+
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+# Originating crud function and parameters of the statements issued in the current context
+_query_tag = contextvars.ContextVar("query_tag", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_OR_PARAM = re.compile(r"(?<![\w.])(?:\$\d+|\d+(?:\.\d+)?)(?![\w.])")
+_IN_LIST = re.compile(r"IN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+# Catalog lookups of schema reflection, issued on behalf of whichever crud call first
+# touches a table; they are not the cost of that call and are not recorded
+_CATALOG = re.compile(
+    r"\b(?:pg_catalog|information_schema)\.|\bduckdb_\w+\(\)|^\s*PRAGMA\b",
+    re.IGNORECASE,
+)
+
+
+@contextmanager
+def tag_queries(name: str, params: dict | None = None):
+    """
+    Attribute every statement issued in the block to `name` called with `params`.
+    """
+    token = _query_tag.set({"function": name, "params": params or {}})
+    try:
+        yield
+    finally:
+        _query_tag.reset(token)
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Normalize a statement to its shape: literals and bound parameters become `?` and IN
+    lists collapse, so calls differing only in parameter values aggregate together.
+    """
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_OR_PARAM.sub("?", shape)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def operator_timings(profile: dict) -> list[dict]:
+    """
+    Flatten a DuckDB JSON profile into its operators, in plan order, with their depth.
+    """
+    operators = []
+
+    def walk(node, depth):
+        name = node.get("operator_name", "").strip()
+        if name and name != "EXPLAIN_ANALYZE":
+            operators.append(
+                {
+                    "operator": name,
+                    "depth": depth,
+                    "timing_ms": round(node.get("operator_timing", 0.0) * 1000, 3),
+                    "cardinality": node.get("operator_cardinality", 0),
+                }
+            )
+            depth += 1
+        for child in node.get("children", []):
+            walk(child, depth)
+
+    walk(profile, 0)
+    return operators
+
+
+class SlowQueryLog:
+    """
+    Capture and aggregate statements slower than `threshold_ms`.
+
+    A shape is re-profiled with EXPLAIN ANALYZE at most once per `profile_interval_s`,
+    so a burst of slow requests does not double the database load. Aggregates are kept
+    per process, for at most `max_shapes` shapes.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float,
+        log_path: str | None = None,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        profile_interval_s: float = 60.0,
+        max_shapes: int = 1000,
+    ):
+        self.threshold_ms = threshold_ms
+        self.profile_interval_s = profile_interval_s
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._shapes = {}
+        self._log = None
+        if log_path:
+            self._log = logging.getLogger(
+                f"db.slow_queries.{os.path.abspath(log_path)}"
+            )
+            if not self._log.handlers:
+                os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+                self._log.addHandler(
+                    RotatingFileHandler(
+                        log_path, maxBytes=max_bytes, backupCount=backup_count
+                    )
+                )
+                self._log.setLevel(logging.INFO)
+                self._log.propagate = False
+
+    def attach(self, engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, *args):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, *args):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        if elapsed_ms >= self.threshold_ms and not _CATALOG.search(statement):
+            self._record(conn, statement, parameters, elapsed_ms)
+
+    def _handle_error(self, context):
+        # A failed statement never reaches after_cursor_execute; drop its start time so
+        # it does not stand in for the start of the connection's next statement
+        if context.connection is not None:
+            query_start = context.connection.info.get("query_start")
+            if query_start:
+                query_start.pop()
+
+    def _profile(self, conn, statement, parameters) -> dict | None:
+        if conn.dialect.name != "duckdb":
+            return None
+        # A duplicate connection keeps the pending result of the original statement
+        # intact; duckdb-engine's cursors all share the one DuckDB connection
+        cursor = conn.connection.driver_connection.duplicate()
+        try:
+            rows = cursor.execute(
+                f"EXPLAIN (ANALYZE, FORMAT JSON) {statement}", parameters
+            ).fetchall()
+            return json.loads(rows[0][1])
+        except Exception:
+            return None
+        finally:
+            cursor.close()
+
+    def _record(self, conn, statement, parameters, elapsed_ms) -> None:
+        shape = statement_shape(statement)
+        tag = _query_tag.get()
+        now = time.time()
+        with self._lock:
+            stats = self._shapes.get(shape)
+            if stats is None and len(self._shapes) >= self.max_shapes:
+                return
+            profile_due = stats is None or (
+                now - stats["profiled_at"] >= self.profile_interval_s
+            )
+            if stats is None:
+                stats = self._shapes[shape] = {
+                    "shape": shape,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "last_tag": None,
+                    "operators": [],
+                    "profiled_at": float("-inf"),
+                }
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["last_tag"] = tag
+            if profile_due:
+                stats["profiled_at"] = now
+
+        operators = None
+        if profile_due:
+            profile = self._profile(conn, statement, parameters)
+            if profile is not None:
+                operators = operator_timings(profile)
+                with self._lock:
+                    stats["operators"] = operators
+
+        if self._log is not None:
+            self._log.info(
+                json.dumps(
+                    {
+                        "timestamp": now,
+                        "elapsed_ms": round(elapsed_ms, 3),
+                        "tag": tag,
+                        "shape": shape,
+                        "statement": statement,
+                        "parameters": parameters,
+                        "operators": operators,
+                    },
+                    default=str,
+                )
+            )
+
+    def top(self, n: int = 10) -> list[dict]:
+        """
+        The `n` statement shapes with the slowest single execution.
+        """
+        with self._lock:
+            shapes = sorted(self._shapes.values(), key=lambda s: -s["max_ms"])[:n]
+            return [
+                {
+                    "shape": s["shape"],
+                    "count": s["count"],
+                    "max_ms": round(s["max_ms"], 3),
+                    "mean_ms": round(s["total_ms"] / s["count"], 3),
+                    "last_tag": s["last_tag"],
+                    "operators": list(s["operators"]),
+                }
+                for s in shapes
+            ]
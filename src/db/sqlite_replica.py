@@ -0,0 +1,182 @@
+"""
+SQLite replicas of the analysis schema of published DuckDB database versions.
+
+A replica is built once per version, by the first worker that serves it, and opened
+read-only with the DuckDB functions the crud selects use registered as Python functions.
+"""
+
+from contextlib import closing
+from db.constant import SchemaNames
+from urllib.parse import quote
+
+import duckdb
+import fcntl
+import glob
+import math
+import os
+import sqlite3
+
+_INTEGER_TYPES = {
+    "BOOLEAN",
+    "TINYINT",
+    "SMALLINT",
+    "INTEGER",
+    "BIGINT",
+    "HUGEINT",
+    "UTINYINT",
+    "USMALLINT",
+    "UINTEGER",
+    "UBIGINT",
+}
+_REAL_TYPES = {"FLOAT", "DOUBLE"}
+
+
+def _sqlite_column(name: str, duckdb_type: str) -> tuple[str, str]:
+    """
+    SQLite column type of a DuckDB column, and the expression selecting its values in a
+    form sqlite3 can bind. ENUMs, decimals and temporal types are converted on the way.
+    """
+    quoted = f'"{name}"'
+    if duckdb_type in _INTEGER_TYPES:
+        return "INTEGER", quoted
+    if duckdb_type in _REAL_TYPES:
+        return "REAL", quoted
+    if duckdb_type.startswith("DECIMAL"):
+        return "REAL", f"CAST({quoted} AS DOUBLE)"
+    return "TEXT", f"CAST({quoted} AS VARCHAR)"
+
+
+def _copy_analysis_schema(source: str, path: str, batch_rows: int) -> None:
+    with closing(duckdb.connect()) as src, closing(sqlite3.connect(path)) as dst:
+        src.execute(f"ATTACH '{source}' AS source (READ_ONLY)")
+        tables = src.execute(
+            # Views included: with partitioned storage the frequency tables are views
+            "SELECT table_name FROM information_schema.tables "
+            "WHERE table_catalog = 'source' AND table_schema = ? ORDER BY table_name",
+            [SchemaNames.ANALYSIS],
+        ).fetchall()
+        for (table,) in tables:
+            columns = src.execute(
+                "SELECT column_name, data_type FROM duckdb_columns() "
+                "WHERE database_name = 'source' AND schema_name = ? AND table_name = ? "
+                "ORDER BY column_index",
+                [SchemaNames.ANALYSIS, table],
+            ).fetchall()
+            names = [name for name, _ in columns]
+            types, exprs = zip(*(_sqlite_column(*column) for column in columns))
+            dst.execute(
+                f'CREATE TABLE "{table}" ('
+                + ", ".join(f'"{n}" {t}' for n, t in zip(names, types))
+                + ")"
+            )
+
+            cursor = src.execute(
+                f"SELECT {', '.join(exprs)} "
+                f'FROM source.{SchemaNames.ANALYSIS}."{table}"'
+            )
+            insert = f'INSERT INTO "{table}" VALUES ({", ".join("?" * len(names))})'
+            while rows := cursor.fetchmany(batch_rows):
+                dst.executemany(insert, rows)
+
+            # SQLite has no zone maps; index the dashboard filters instead
+            if {"sample_type", "time_from_treatment_start"} <= set(names):
+                dst.execute(
+                    f'CREATE INDEX "{table}_filters" '
+                    f'ON "{table}" (sample_type, time_from_treatment_start)'
+                )
+        dst.execute("ANALYZE")
+        dst.commit()
+
+
+def _prune_replicas(replica_dir: str, source: str) -> None:
+    """
+    Delete the replicas of versions whose DuckDB file the loader has removed.
+    """
+    versions_dir = os.path.dirname(source)
+    for path in glob.glob(os.path.join(replica_dir, "*.sqlite")):
+        version = os.path.splitext(os.path.basename(path))[0]
+        if not os.path.exists(os.path.join(versions_dir, version)):
+            for stale in (path, f"{path}.lock"):
+                if os.path.exists(stale):
+                    os.remove(stale)
+
+
+def build_sqlite_replica(
+    source: str, replica_dir: str, batch_rows: int = 100_000
+) -> str:
+    """
+    Path of the SQLite replica of the DuckDB file `source`, building it first if no worker
+    has yet. Replicas are named after the version file they copy.
+    """
+    path = os.path.join(replica_dir, f"{os.path.basename(source)}.sqlite")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(replica_dir, exist_ok=True)
+    with open(f"{path}.lock", "w") as lock:
+        # Held until the file is closed; other workers wait for the replica
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(path):
+            # Built under a temporary name and renamed, so nobody opens a partial file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                _copy_analysis_schema(source, tmp_path, batch_rows)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+    _prune_replicas(replica_dir, source)
+    return path
+
+
+class _QuantileCont:
+    """
+    DuckDB's `quantile_cont`: the quantile interpolated linearly between the two nearest
+    values.
+    """
+
+    def __init__(self):
+        self.values = []
+        self.quantile = 0.5
+
+    def step(self, value, quantile):
+        if value is not None:
+            self.values.append(value)
+            self.quantile = quantile
+
+    def finalize(self):
+        if not self.values:
+            return None
+        values = sorted(self.values)
+        position = self.quantile * (len(values) - 1)
+        lower = math.floor(position)
+        upper = min(lower + 1, len(values) - 1)
+        return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class _Median(_QuantileCont):
+    def step(self, value):
+        super().step(value, 0.5)
+
+
+def _greatest(*values):
+    return max((v for v in values if v is not None), default=None)
+
+
+def _least(*values):
+    return min((v for v in values if v is not None), default=None)
+
+
+def connect_sqlite_replica(path: str) -> sqlite3.Connection:
+    """
+    Open the replica at `path` read-only as the `analysis` schema of a new connection.
+    """
+    conn = sqlite3.connect(":memory:", uri=True, check_same_thread=False)
+    conn.execute(
+        f"ATTACH DATABASE ? AS {SchemaNames.ANALYSIS}", (f"file:{quote(path)}?mode=ro",)
+    )
+    conn.create_aggregate("quantile_cont", 2, _QuantileCont)
+    conn.create_aggregate("median", 1, _Median)
+    conn.create_function("greatest", -1, _greatest, deterministic=True)
+    conn.create_function("least", -1, _least, deterministic=True)
+    return conn
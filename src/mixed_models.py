@@ -0,0 +1,169 @@
+from concurrent.futures import ProcessPoolExecutor
+from scipy.optimize import minimize_scalar
+from scipy.stats import false_discovery_control, norm
+
+import multiprocessing
+import numpy as np
+import os
+import pandas as pd
+
+# Fixed effects of percentage ~ response * time + age + sex + (1 | subject)
+MODEL_TERMS = [
+    "intercept",
+    "response_yes",
+    "time_from_treatment_start",
+    "response_yes:time_from_treatment_start",
+    "age",
+    "sex_M",
+]
+
+
+def _design_matrix(df):
+    response = (df.response == "yes").to_numpy(dtype=float)
+    time = df.time_from_treatment_start.to_numpy(dtype=float)
+    return np.column_stack(
+        [
+            np.ones(len(df)),
+            response,
+            time,
+            response * time,
+            df.age.to_numpy(dtype=float),
+            (df.sex == "M").to_numpy(dtype=float),
+        ]
+    )
+
+
+def _estimable_columns(X):
+    """
+    Mask of the design columns kept for the fit: each column is kept if it is not a
+    linear combination of the columns kept before it. A cohort sampled at one timepoint
+    or of one sex makes the time or sex terms aliased with the intercept.
+    """
+    keep = np.zeros(X.shape[1], dtype=bool)
+    for j in range(X.shape[1]):
+        keep[j] = True
+        if np.linalg.matrix_rank(X[:, keep]) < keep.sum():
+            keep[j] = False
+    return keep
+
+
+def _gls_fit(y, X, subject_codes, group_sizes, group_sums_y, group_sums_X, ratio):
+    """
+    GLS fit for a fixed ratio of subject to residual variance.
+
+    With a random intercept, V^{-1/2} quasi-demeans each subject's rows by
+    theta_i = 1 - 1 / sqrt(1 + n_i * ratio), turning GLS into OLS on transformed data.
+    """
+    theta = 1 - 1 / np.sqrt(1 + group_sizes * ratio)
+    shrink = (theta / group_sizes)[subject_codes]
+    y_t = y - shrink * group_sums_y[subject_codes]
+    X_t = X - shrink[:, None] * group_sums_X[subject_codes]
+    beta, *_ = np.linalg.lstsq(X_t, y_t, rcond=None)
+    rss = float(np.sum((y_t - X_t @ beta) ** 2))
+    return beta, rss, X_t
+
+
+def fit_random_intercept_model(df, value_col="percentage"):
+    """
+    Fit `value ~ response * time + age + sex + (1 | subject)` by REML.
+
+    The variance ratio is found by a bounded 1-D search over the profiled restricted
+    log-likelihood; every evaluation is one vectorized GLS solve. Returns one row per
+    fixed-effect term with Wald statistics, plus the variance components. Terms the data
+    cannot estimate, being aliased with earlier ones, are left out of the fit and
+    reported with NaN estimates.
+    """
+    df = df.dropna(subset=[value_col, "response", "age", "sex"])
+    y = df[value_col].to_numpy(dtype=float)
+    X = _design_matrix(df)
+    estimable = _estimable_columns(X)
+    X = X[:, estimable]
+    subject_codes, subjects = pd.factorize(df.subject)
+    n_obs, n_terms = X.shape
+
+    group_sizes = np.bincount(subject_codes).astype(float)
+    group_sums_y = np.bincount(subject_codes, weights=y)
+    group_sums_X = np.column_stack(
+        [np.bincount(subject_codes, weights=X[:, j]) for j in range(n_terms)]
+    )
+    args = (y, X, subject_codes, group_sizes, group_sums_y, group_sums_X)
+
+    def neg_reml(log_ratio):
+        ratio = np.exp(log_ratio)
+        _, rss, X_t = _gls_fit(*args, ratio)
+        _, logdet_xtx = np.linalg.slogdet(X_t.T @ X_t)
+        return 0.5 * (
+            (n_obs - n_terms) * np.log(rss)
+            + np.sum(np.log1p(group_sizes * ratio))
+            + logdet_xtx
+        )
+
+    log_ratio = minimize_scalar(neg_reml, bounds=(-12, 8), method="bounded").x
+    ratio = np.exp(log_ratio)
+    beta, rss, X_t = _gls_fit(*args, ratio)
+    residual_variance = rss / (n_obs - n_terms)
+    std_error = np.sqrt(residual_variance * np.diag(np.linalg.pinv(X_t.T @ X_t)))
+    statistic = beta / std_error
+
+    def per_term(values):
+        full = np.full(len(MODEL_TERMS), np.nan)
+        full[estimable] = values
+        return full
+
+    return pd.DataFrame(
+        {
+            "term": MODEL_TERMS,
+            "estimate": per_term(beta),
+            "std_error": per_term(std_error),
+            "statistic": per_term(statistic),
+            "raw_p_value": per_term(2 * norm.sf(np.abs(statistic))),
+            "n_obs": n_obs,
+            "n_subjects": len(subjects),
+            "subject_variance": ratio * residual_variance,
+            "residual_variance": residual_variance,
+        }
+    )
+
+
+def _fit_population(task):
+    population, df, value_col = task
+    return fit_random_intercept_model(df, value_col=value_col).assign(
+        population=population
+    )
+
+
+def fit_population_models(df, value_col="percentage", max_workers=None):
+    """
+    Fit the random intercept model for every population, spread across worker
+    processes, and FDR-adjust each term's p-values across populations.
+
+    Expects one row per (sample, population) with subject, population, response,
+    time_from_treatment_start, age, sex and `value_col`.
+    """
+    tasks = [
+        (str(population), g, value_col)
+        for population, g in df.groupby("population", observed=True)
+    ]
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if max_workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            fits = list(pool.map(_fit_population, tasks))
+    else:
+        fits = [_fit_population(task) for task in tasks]
+
+    if not fits:
+        return pd.DataFrame(
+            columns=["population", "term", "estimate", "raw_p_value", "fdr_adj_p_val"]
+        )
+    results = pd.concat(fits, ignore_index=True)
+    valid = ~results.raw_p_value.isna()
+    results.loc[valid, "fdr_adj_p_val"] = (
+        results[valid].groupby("term").raw_p_value.transform(false_discovery_control)
+    )
+    results["neg_log_fdr_adj_p_val"] = -np.log10(results.fdr_adj_p_val.fillna(1))
+    columns = ["population", "term"] + [
+        c for c in results.columns if c not in ("population", "term")
+    ]
+    return results[columns]
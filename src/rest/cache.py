@@ -0,0 +1,107 @@
+"""
+In-process caching of computed API results.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+import threading
+
+
+class SingleFlight:
+    """
+    Share one in-flight computation among concurrent callers with the same key.
+
+    The first caller of a key computes it; callers arriving before it finishes wait and
+    receive its result, or its exception. Nothing is kept once the computation is done.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._computations = 0
+        self._coalesced = 0
+
+    def do(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+                self._computations += 1
+            else:
+                self._coalesced += 1
+        if not leader:
+            return call.result()
+
+        try:
+            call.set_result(compute())
+        except BaseException as e:
+            call.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.result()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "computations": self._computations,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+class VersionedCache:
+    """
+    Thread-safe cache of results computed against one database version.
+
+    All entries are dropped as soon as a lookup arrives with a different version, so results
+    computed against a replaced database file are never served. Concurrent misses of the
+    same entry are coalesced into a single computation. Keys come from request parameters,
+    so at most `max_entries` are kept, evicting the least recently used.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._version = None
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._evictions = 0
+        self._flight = SingleFlight()
+
+    def get_or_compute(
+        self, version: str, key: Hashable, compute: Callable[[], Any]
+    ) -> Any:
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._entries = OrderedDict()
+            if key in self._entries:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        def compute_and_store():
+            value = compute()
+            with self._lock:
+                if version == self._version:
+                    self._entries[key] = value
+                    if len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self._evictions += 1
+            return value
+
+        return self._flight.do((version, key), compute_and_store)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            hits, evictions = self._hits, self._evictions
+        return {"hits": hits, "evictions": evictions, **self._flight.stats()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version = None
+            self._entries = OrderedDict()
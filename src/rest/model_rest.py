@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 
 class RelativeCellFrequencyResult(BaseModel):
@@ -28,6 +28,105 @@ class BoxPlotStatsResult(BaseModel):
     raw_p_value: Optional[float] = None
     fdr_adj_p_val: Optional[float] = None
     neg_log_fdr_adj_p_val: Optional[float] = None
+    # Column the statistical test ran on: percentage or clr
+    value_col: str = "percentage"
+    # Only reported by the permutation test
+    median_difference: Optional[float] = None
+    median_difference_ci_low: Optional[float] = None
+    median_difference_ci_high: Optional[float] = None
+    # Permutations behind the p-value, fewer than configured when it stopped early
+    n_permutations: Optional[int] = None
+    # Bootstrap resamples behind the confidence interval, always the configured number
+    n_bootstrap_resamples: Optional[int] = None
+
+
+class HistogramBin(BaseModel):
+    bin_start: float
+    bin_end: float
+    count: int
+
+
+class Outlier(BaseModel):
+    sample: str
+    percentage: float
+    # How far beyond the nearer whisker the value lies
+    distance: float
+
+
+class DistributionResult(BaseModel):
+    """Model for the DistributionResult endpoint."""
+
+    population: str
+    response: str
+    time_from_treatment_start: int
+    n_samples: int
+    lower_whisker: float
+    upper_whisker: float
+    # Non-empty bins only
+    histogram: List[HistogramBin]
+    # The furthest beyond the whiskers first
+    outliers: List[Outlier]
+
+
+class LongitudinalStatsResult(BaseModel):
+    """Model for the LongitudinalStatsResult endpoint."""
+
+    population: str
+    response: str
+    baseline_time_from_treatment_start: int
+    time_from_treatment_start: int
+    n_pairs: int
+    baseline_mean: float
+    followup_mean: float
+    mean_difference: float
+    median_difference: float
+    statistic: Optional[float] = None
+    raw_p_value: Optional[float] = None
+    fdr_adj_p_val: Optional[float] = None
+    neg_log_fdr_adj_p_val: Optional[float] = None
+
+
+class MixedModelResult(BaseModel):
+    """Model for the MixedModelResult endpoint."""
+
+    dataset_version: str
+    population: str
+    term: str
+    # None for terms the data cannot estimate, e.g. time when every sample shares one
+    # timepoint
+    estimate: Optional[float] = None
+    std_error: Optional[float] = None
+    statistic: Optional[float] = None
+    raw_p_value: Optional[float] = None
+    fdr_adj_p_val: Optional[float] = None
+    neg_log_fdr_adj_p_val: float
+    n_obs: int
+    n_subjects: int
+    subject_variance: float
+    residual_variance: float
+
+
+class OperatorTiming(BaseModel):
+    operator: str
+    depth: int
+    timing_ms: float
+    cardinality: int
+
+
+class QueryTag(BaseModel):
+    function: str
+    params: Dict[str, Any]
+
+
+class SlowQueryResult(BaseModel):
+    """Model for the SlowQueryResult endpoint."""
+
+    shape: str
+    count: int
+    max_ms: float
+    mean_ms: float
+    last_tag: Optional[QueryTag] = None
+    operators: List[OperatorTiming]
 
 
 class ProjectSampleCount(BaseModel):
@@ -0,0 +1,130 @@
+"""
+Result tables shared by the API worker processes of one host.
+"""
+
+from collections.abc import Sequence
+from typing import Any, Callable, Dict
+
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import pyarrow as pa
+import shutil
+import threading
+
+
+class ArrowResultStore:
+    """
+    Computed result tables stored as Arrow IPC files under
+    `directory/<version>/<code version>/<name>/<parameter hash>.arrow` and memory-mapped by
+    every worker. The directory outlives restarts and deploys, so `code_version` should
+    change with the code computing the results; tables of other code are never served.
+
+    Reads are zero-copy from the shared page cache, so memory use does not grow with the
+    number of workers. A table is computed by the first worker that needs it, while the
+    others wait on a file lock and then map its result.
+
+    Parameters come from requests, so at most `max_entries` tables are stored per version;
+    results beyond that are computed per request and not stored.
+    """
+
+    def __init__(self, directory: str, code_version: str = "", max_entries: int = 256):
+        self.directory = directory
+        self.code_version = code_version
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._version = None
+        self._tables = {}
+
+    def _path(self, version: str, name: str, params: Dict[str, Any]) -> str:
+        key = json.dumps(params, sort_keys=True, default=str).encode()
+        digest = hashlib.sha256(key).hexdigest()[:16]
+        return os.path.join(self._results_dir(version), name, f"{digest}.arrow")
+
+    def _results_dir(self, version: str) -> str:
+        return os.path.join(self.directory, version, self.code_version)
+
+    def get_or_compute(
+        self,
+        version: str,
+        name: str,
+        params: Dict[str, Any],
+        compute: Callable[[], pa.Table],
+    ) -> pa.Table:
+        path = self._path(version, name, params)
+        previous_version = None
+        with self._lock:
+            if version != self._version:
+                previous_version, self._version = self._version, version
+                self._tables = {}
+            if path in self._tables:
+                return self._tables[path]
+        if previous_version is not None:
+            # Requests still pinned to the previous version may be writing its results
+            self.prune(version, previous_version)
+
+        if not os.path.exists(path):
+            if self._stored_count(version) >= self.max_entries:
+                return compute()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.lock", "w") as lock:
+                # Held until the file is closed; other workers wait for the result
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                if not os.path.exists(path):
+                    self._write(path, compute())
+
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        with self._lock:
+            if version == self._version:
+                self._tables[path] = table
+        return table
+
+    def _stored_count(self, version: str) -> int:
+        return len(glob.glob(os.path.join(self._results_dir(version), "*", "*.arrow")))
+
+    @staticmethod
+    def _write(path: str, table: pa.Table) -> None:
+        # Written under a temporary name and renamed, so readers never map a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+
+    def prune(self, *keep_versions: str) -> None:
+        """
+        Delete the results of every version not in `keep_versions`. Workers still
+        mapping a deleted file keep reading it until they move to the new version.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for version in os.listdir(self.directory):
+            if version not in keep_versions:
+                shutil.rmtree(os.path.join(self.directory, version), ignore_errors=True)
+
+
+class ArrowRecords(Sequence):
+    """
+    Rows of an Arrow table as a read-only sequence of dicts. Slicing converts only the
+    rows sliced, so a page of a large table costs the size of the page.
+    """
+
+    def __init__(self, table: pa.Table):
+        self._table = table
+
+    def __len__(self) -> int:
+        return self._table.num_rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self._table.slice(start, max(stop - start, 0)).to_pylist()
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._table.slice(index, 1).to_pylist()[0]
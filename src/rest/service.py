@@ -1,27 +1,103 @@
+from contextlib import asynccontextmanager
 from db.connection import create_db_connection, DBConn
 from db.crud import (
     fetch_boxplot_data,
     fetch_dynamic_subset_analysis,
+    fetch_histograms,
+    fetch_model_results,
+    fetch_outliers,
+    fetch_paired_timepoints,
     fetch_relative_cell_frequency,
+    stream_stats_test_data,
+    warm_metadata_cache,
 )
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi_pagination import add_pagination, Page, paginate
+from rest.cache import SingleFlight, VersionedCache
 from rest.model_rest import (
     BoxPlotStatsResult,
+    DistributionResult,
+    LongitudinalStatsResult,
+    MixedModelResult,
     RelativeCellFrequencyResult,
+    SlowQueryResult,
     SubsetAnalysisResult,
 )
-from stat_tests import apply_mannwhitney_test, apply_t_test
-from typing import Callable, Dict, List, Optional
+from rest.result_store import ArrowRecords, ArrowResultStore
+from typing import Callable, Dict, List, Literal, Optional
 
+import hashlib
 import inject
+import logging
 import os
+import pandas as pd
+import pyarrow as pa
+import tempfile
+import threading
 import yaml
 
-# Load configuration from YAML
+# Load configuration from YAML. The API only reads, so by default it opens the database
+# read-only, which lets several worker processes share the same file.
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(CURRENT_DIR, "../..", "data")
-CONFIG_PATH = f"{DATA_DIR}/duckdb_config.yaml"
+CONFIG_PATH = os.getenv("API_DB_CONFIG_PATH", f"{DATA_DIR}/duckdb_api_config.yaml")
+
+# Parameter combinations offered by the dashboard, computed once per worker at startup
+WARM_UP_TIMEPOINTS = [0, 7, 14]
+WARM_UP_TEST_CHOICES = ["mannwhitney", "t-test"]
+WARM_UP_PAIRED_TEST_CHOICES = ["wilcoxon", "t-test"]
+
+# Resampling settings of the permutation test; fixed per deployment so cached results
+# are reproducible
+PERMUTATION_RESAMPLES = int(os.getenv("PERMUTATION_RESAMPLES", "10000"))
+PERMUTATION_SEED = int(os.getenv("PERMUTATION_SEED", "0"))
+PERMUTATION_WORKERS = int(os.getenv("PERMUTATION_WORKERS", "0")) or None
+
+# Streaming mode for cohorts too large to test in memory: Mann-Whitney and t-tests read
+# the filtered rows in Arrow batches of STREAMING_BATCH_ROWS and keep per-group state only
+STREAMING_STATS = os.getenv("STREAMING_STATS", "false").lower() == "true"
+STREAMING_BATCH_ROWS = int(os.getenv("STREAMING_BATCH_ROWS", "65536"))
+
+# Computed results shared by the worker processes of a host, as memory-mapped Arrow files
+RESULT_STORE_DIR = os.getenv(
+    "RESULT_STORE_DIR", os.path.join(tempfile.gettempdir(), "cellanalysis_results")
+)
+# Modules whose code determines the stored results, relative to src/
+RESULT_CODE_MODULES = ["rest/service.py", "db/crud.py", "stat_tests.py"]
+
+# Upper bounds of the distribution route's parameters, which bound its payload
+MAX_DISTRIBUTION_BINS = 200
+MAX_DISTRIBUTION_OUTLIERS = 100
+
+# Liveness and readiness probes, answered without pinning a database version
+UNPINNED_PATHS = {"/health", "/ready"}
+
+# Longitudinal comparisons pair every follow-up timepoint with the pre-treatment sample
+BASELINE_TIME_FROM_TREATMENT_START = 0
+
+
+def _result_code_version() -> str:
+    """
+    Digest of the modules computing stored results. A deploy changing any of them stores
+    its results apart from those computed by the previous code for the same version.
+    """
+    digest = hashlib.sha256()
+    for module in RESULT_CODE_MODULES:
+        with open(os.path.join(CURRENT_DIR, "..", module), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+_logger = logging.getLogger(__name__)
+_boxplot_stats_cache = VersionedCache()
+_longitudinal_stats_cache = VersionedCache()
+_model_results_cache = VersionedCache()
+_distribution_cache = VersionedCache()
+_relative_cell_frequency_flight = SingleFlight()
+_result_store = ArrowResultStore(RESULT_STORE_DIR, code_version=_result_code_version())
+# Set once warm-up has succeeded; /ready reports 503 until then
+_ready = threading.Event()
 
 
 def create_app(
@@ -38,8 +114,11 @@ def create_app(
     with open(config_path) as f:
         config = yaml.safe_load(f)
 
+    # The connection is created on first use (warm-up), not at import
     inject.clear_and_configure(
-        lambda binder: binder.bind(DBConn, create_db_connection(config))
+        lambda binder: binder.bind_to_constructor(
+            DBConn, lambda: create_db_connection(config)
+        )
     )
     app = FastAPI(lifespan=lifespan) if lifespan else FastAPI()
 
@@ -54,10 +133,102 @@ def create_app(
     return app
 
 
-app = create_app(CONFIG_PATH, app_name="Cell Count Analysis Service")
+def warm_up() -> None:
+    """
+    Reflect the schema, run each hot query once for the dashboard defaults and prime the
+    response caches, so the first requests a worker receives do not pay for cold caches
+    or cold DuckDB buffers.
+    """
+    conn = inject.instance(DBConn)
+    with conn.pin_version() as version:
+        _result_store.prune(version)
+        warm_metadata_cache(conn)
+        _relative_cell_frequency_records()
+        fetch_dynamic_subset_analysis()
+        _cached_model_results()
+        for time_from_treatment_start in WARM_UP_TIMEPOINTS:
+            for test_choice in WARM_UP_TEST_CHOICES:
+                _cached_boxplot_stats(time_from_treatment_start, test_choice)
+            if time_from_treatment_start == BASELINE_TIME_FROM_TREATMENT_START:
+                continue
+            for test_choice in WARM_UP_PAIRED_TEST_CHOICES:
+                _cached_longitudinal_stats(time_from_treatment_start, test_choice)
+    _logger.info(f"Warmed caches for database version {version}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await run_in_threadpool(warm_up)
+    except Exception:
+        # The worker still serves requests, but stays unready so the healthcheck and
+        # load balancers keep traffic on workers that did warm up
+        _logger.exception("Cache warm-up failed, /ready keeps reporting 503")
+    else:
+        _ready.set()
+    yield
+    _ready.clear()
+
+
+app = create_app(CONFIG_PATH, app_name="Cell Count Analysis Service", lifespan=lifespan)
 add_pagination(app)
 
 
+@app.get("/ready")
+def readiness_check() -> Dict[str, str]:
+    """
+    Readiness endpoint for the service. Reports 503 until the worker has warmed up, so
+    rolling restarts only route users to warm workers.
+    """
+    if not _ready.is_set():
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {"status": "ready"}
+
+
+@app.get("/debug/slow_queries")
+def get_slow_queries(top: int = Query(10, ge=1, le=1000)) -> List[SlowQueryResult]:
+    """
+    List the `top` statement shapes with the slowest executions seen by this worker,
+    with the crud function that last issued them and DuckDB's per-operator timings.
+    Enabled by `slow_query_ms` in the DB config.
+    """
+    slow_queries = inject.instance(DBConn).slow_queries
+    if slow_queries is None:
+        raise HTTPException(status_code=404, detail="Slow query log is disabled")
+    return slow_queries.top(top)
+
+
+@app.get("/debug/coalescing")
+def get_coalescing_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Per route, how many requests of this worker were answered from cache, how many ran
+    a computation, how many were coalesced into a computation already in flight for the
+    same parameters, and how many cached results were evicted.
+    """
+    return {
+        "relative_cell_frequency": _relative_cell_frequency_flight.stats(),
+        "boxplot_stats": _boxplot_stats_cache.stats(),
+        "longitudinal_stats": _longitudinal_stats_cache.stats(),
+        "mixed_model": _model_results_cache.stats(),
+        "distribution": _distribution_cache.stats(),
+    }
+
+
+@app.middleware("http")
+async def pin_database_version(request: Request, call_next):
+    """
+    Pin every request to the database version current when it arrives. Requests that start
+    after the loader publishes a new file use it, while in-flight ones finish on the old one.
+    Probes never touch the database, so they are answered without a pin.
+    """
+    if request.url.path in UNPINNED_PATHS:
+        return await call_next(request)
+    conn = inject.instance(DBConn)
+    pin = await run_in_threadpool(conn.acquire_pin)
+    with conn.pin_version(pin):
+        return await call_next(request)
+
+
 @app.get("/analysis_results/relative_cell_frequency")
 def get_relative_cell_frequency() -> Page[RelativeCellFrequencyResult]:
     """
@@ -67,11 +238,7 @@ def get_relative_cell_frequency() -> Page[RelativeCellFrequencyResult]:
         Page[RelativeCellFrequencyResult]: Paginated relative cell frequency results.
     """
     try:
-        # Fetch data from database
-        df = fetch_relative_cell_frequency()
-        results = df.to_dict("records")
-
-        return paginate(results)
+        return paginate(_relative_cell_frequency_records())
 
     except Exception as e:
         raise HTTPException(
@@ -80,44 +247,323 @@ def get_relative_cell_frequency() -> Page[RelativeCellFrequencyResult]:
         )
 
 
+def _relative_cell_frequency_records() -> ArrowRecords:
+    """
+    The relative cell frequency table of the current version from the result store; a
+    page only converts its own rows. Concurrent requests share one lookup.
+    """
+    version = inject.instance(DBConn).version
+    table = _relative_cell_frequency_flight.do(
+        version,
+        lambda: _result_store.get_or_compute(
+            version,
+            "relative_cell_frequency",
+            {},
+            lambda: pa.Table.from_pandas(
+                fetch_relative_cell_frequency(), preserve_index=False
+            ),
+        ),
+    )
+    return ArrowRecords(table)
+
+
 @app.get("/analysis_results/boxplot_stats/{time_from_treatment_start}/{test_choice}")
 def get_boxplot_stats(
-    time_from_treatment_start: int, test_choice: str
+    time_from_treatment_start: int,
+    test_choice: Literal["mannwhitney", "t-test", "permutation"],
+    value_col: Literal["percentage", "clr"] = "percentage",
 ) -> List[BoxPlotStatsResult]:
     """
     Retrieve box plot statistics for relative cell frequency analysis.
     Compares responder vs non-responder for  cell populations
     in PBMC samples from melanoma patients.
 
+    The box plot summary is always of percentages. `value_col=clr` runs the statistical
+    test on the centered log-ratios the loader stores next to them instead, which
+    accounts for percentages of one sample summing to 100.
+
     Returns:
         List[BoxPlotStatsResult]: Box plot statistics results.
     """
     try:
-        boxplot_df = fetch_boxplot_data(
-            time_from_treatment_start=time_from_treatment_start
+        return _cached_boxplot_stats(time_from_treatment_start, test_choice, value_col)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error fetching box plot statistics data: {str(e)}"
+        )
+
+
+def _compute_boxplot_stats(
+    time_from_treatment_start: int, test_choice: str, value_col: str = "percentage"
+) -> pd.DataFrame:
+    # scipy takes about a second to import; defer it to warm-up instead of module import
+    from stat_tests import (
+        apply_mannwhitney_test,
+        apply_permutation_test,
+        apply_streaming_test,
+        apply_t_test,
+    )
+
+    boxplot_df = fetch_boxplot_data(time_from_treatment_start=time_from_treatment_start)
+    if STREAMING_STATS and test_choice in ("mannwhitney", "t-test"):
+        test_results = apply_streaming_test(
+            stream_stats_test_data(
+                time_from_treatment_start=time_from_treatment_start,
+                value_col=value_col,
+                batch_rows=STREAMING_BATCH_ROWS,
+            ),
+            test=test_choice,
+            value_col=value_col,
         )
-        stats_test_raw_data = fetch_relative_cell_frequency(
-            additional_filters=True, time_from_treatment_start=time_from_treatment_start
+        return _merge_boxplot_stats(boxplot_df, test_results, value_col)
+
+    stats_test_raw_data = fetch_relative_cell_frequency(
+        additional_filters=True, time_from_treatment_start=time_from_treatment_start
+    )
+    if test_choice == "mannwhitney":
+        test_results = apply_mannwhitney_test(stats_test_raw_data, value_col=value_col)
+    elif test_choice == "t-test":
+        test_results = apply_t_test(stats_test_raw_data, value_col=value_col)
+    elif test_choice == "permutation":
+        test_results = apply_permutation_test(
+            stats_test_raw_data,
+            value_col=value_col,
+            n_resamples=PERMUTATION_RESAMPLES,
+            seed=PERMUTATION_SEED,
+            max_workers=PERMUTATION_WORKERS,
         )
-        if test_choice == "mannwhitney":
-            test_results = apply_mannwhitney_test(
-                stats_test_raw_data, value_col="percentage"
+    return _merge_boxplot_stats(boxplot_df, test_results, value_col)
+
+
+def _merge_boxplot_stats(boxplot_df, test_results, value_col: str) -> pd.DataFrame:
+    # Merge boxplot stats with statistical test results
+    return boxplot_df.merge(
+        test_results, on=["population", "time_from_treatment_start"], how="left"
+    ).assign(value_col=value_col)
+
+
+def _stored_results(name: str, params: dict, compute: Callable[[], pd.DataFrame]):
+    """
+    Rows of a computed result frame, computed once per version and parameters by any
+    worker and read back from the shared result store.
+    """
+    table = _result_store.get_or_compute(
+        inject.instance(DBConn).version,
+        name,
+        params,
+        lambda: pa.Table.from_pandas(compute(), preserve_index=False),
+    )
+    return table.to_pylist()
+
+
+def _cached_boxplot_stats(
+    time_from_treatment_start: int, test_choice: str, value_col: str = "percentage"
+) -> List[BoxPlotStatsResult]:
+    """
+    Box plot statistics only change when a new database version is published, so they are
+    computed once per version and parameter combination.
+    """
+    params = {
+        "time_from_treatment_start": time_from_treatment_start,
+        "test_choice": test_choice,
+        "value_col": value_col,
+    }
+    # Deployment settings that change the results are part of the stored key
+    if test_choice == "permutation":
+        params.update(n_resamples=PERMUTATION_RESAMPLES, seed=PERMUTATION_SEED)
+    elif STREAMING_STATS:
+        params.update(streaming=True)
+    return _boxplot_stats_cache.get_or_compute(
+        inject.instance(DBConn).version,
+        (time_from_treatment_start, test_choice, value_col),
+        lambda: [
+            BoxPlotStatsResult(**result)
+            for result in _stored_results(
+                "boxplot_stats",
+                params,
+                lambda: _compute_boxplot_stats(
+                    time_from_treatment_start, test_choice, value_col
+                ),
             )
-        elif test_choice == "t-test":
-            test_results = apply_t_test(stats_test_raw_data, value_col="percentage")
-        # Merge boxplot stats with statistical test results
-        df = boxplot_df.merge(
-            test_results, on=["population", "time_from_treatment_start"], how="left"
+        ],
+    )
+
+
+@app.get("/analysis_results/distribution/{time_from_treatment_start}")
+def get_distribution(
+    time_from_treatment_start: int,
+    bins: int = Query(50, ge=1, le=MAX_DISTRIBUTION_BINS),
+    top_k: int = Query(10, ge=0, le=MAX_DISTRIBUTION_OUTLIERS),
+) -> List[DistributionResult]:
+    """
+    Retrieve the distribution behind each box plot of `boxplot_stats`: a histogram of the
+    relative frequencies over `bins` equal-width bins spanning 0-100%, and the `top_k`
+    samples furthest beyond the whiskers.
+
+    Both are computed in the database, so the payload is bounded by `bins` and `top_k`
+    per (population, response) whatever the cohort size.
+
+    Returns:
+        List[DistributionResult]: Histogram and outliers per population and response.
+    """
+    try:
+        return _distribution_cache.get_or_compute(
+            inject.instance(DBConn).version,
+            (time_from_treatment_start, bins, top_k),
+            lambda: _compute_distribution(time_from_treatment_start, bins, top_k),
         )
-        results = df.to_dict("records")
-        return [BoxPlotStatsResult(**result) for result in results]
 
     except Exception as e:
         raise HTTPException(
-            status_code=500, detail=f"Error fetching box plot statistics data: {str(e)}"
+            status_code=500, detail=f"Error fetching distribution data: {str(e)}"
+        )
+
+
+def _compute_distribution(
+    time_from_treatment_start: int, bins: int, top_k: int
+) -> List[DistributionResult]:
+    boxplot_df = fetch_boxplot_data(time_from_treatment_start=time_from_treatment_start)
+    histograms = fetch_histograms(
+        time_from_treatment_start=time_from_treatment_start, bins=bins
+    )
+    outliers = fetch_outliers(
+        time_from_treatment_start=time_from_treatment_start, top_k=top_k
+    )
+    bin_width = 100.0 / bins
+    histograms = histograms.assign(
+        bin_start=histograms["bin"] * bin_width,
+        bin_end=(histograms["bin"] + 1) * bin_width,
+    )
+
+    group_keys = ["population", "response"]
+    histograms_by_group = dict(list(histograms.groupby(group_keys, observed=True)))
+    outliers_by_group = dict(list(outliers.groupby(group_keys, observed=True)))
+
+    results = []
+    for box in boxplot_df.to_dict("records"):
+        key = (box["population"], box["response"])
+        histogram = histograms_by_group.get(key, histograms.iloc[:0])
+        group_outliers = outliers_by_group.get(key, outliers.iloc[:0])
+        results.append(
+            DistributionResult(
+                population=box["population"],
+                response=box["response"],
+                time_from_treatment_start=time_from_treatment_start,
+                n_samples=int(histogram["count"].sum()),
+                lower_whisker=box["lower_whisker"],
+                upper_whisker=box["upper_whisker"],
+                histogram=histogram[["bin_start", "bin_end", "count"]].to_dict(
+                    "records"
+                ),
+                outliers=group_outliers[["sample", "percentage", "distance"]].to_dict(
+                    "records"
+                ),
+            )
+        )
+    return results
+
+
+@app.get("/analysis_results/longitudinal/{time_from_treatment_start}/{test_choice}")
+def get_longitudinal_stats(
+    time_from_treatment_start: int, test_choice: Literal["wilcoxon", "t-test"]
+) -> List[LongitudinalStatsResult]:
+    """
+    Retrieve paired longitudinal statistics comparing each subject's relative cell
+    frequencies at `time_from_treatment_start` against baseline, per response group and
+    population, in PBMC samples from melanoma patients.
+
+    Returns:
+        List[LongitudinalStatsResult]: Paired test results with FDR-adjusted p-values.
+    """
+    if time_from_treatment_start == BASELINE_TIME_FROM_TREATMENT_START:
+        raise HTTPException(
+            status_code=422,
+            detail="time_from_treatment_start must differ from the baseline timepoint "
+            f"{BASELINE_TIME_FROM_TREATMENT_START}",
+        )
+    try:
+        return _cached_longitudinal_stats(time_from_treatment_start, test_choice)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching longitudinal statistics data: {str(e)}",
+        )
+
+
+def _compute_longitudinal_stats(
+    time_from_treatment_start: int, test_choice: str
+) -> pd.DataFrame:
+    from stat_tests import apply_paired_test
+
+    pairs = fetch_paired_timepoints(
+        time_from_treatment_start=time_from_treatment_start,
+        baseline_time_from_treatment_start=BASELINE_TIME_FROM_TREATMENT_START,
+    )
+    return apply_paired_test(pairs, test=test_choice).assign(
+        baseline_time_from_treatment_start=BASELINE_TIME_FROM_TREATMENT_START,
+        time_from_treatment_start=time_from_treatment_start,
+    )
+
+
+def _cached_longitudinal_stats(
+    time_from_treatment_start: int, test_choice: str
+) -> List[LongitudinalStatsResult]:
+    return _longitudinal_stats_cache.get_or_compute(
+        inject.instance(DBConn).version,
+        (time_from_treatment_start, test_choice),
+        lambda: [
+            LongitudinalStatsResult(**result)
+            for result in _stored_results(
+                "longitudinal_stats",
+                {
+                    "time_from_treatment_start": time_from_treatment_start,
+                    "test_choice": test_choice,
+                },
+                lambda: _compute_longitudinal_stats(
+                    time_from_treatment_start, test_choice
+                ),
+            )
+        ],
+    )
+
+
+@app.get("/analysis_results/mixed_model")
+def get_mixed_model_results() -> List[MixedModelResult]:
+    """
+    Retrieve the per-population linear mixed effects model
+    `percentage ~ response * time + age + sex + (1 | subject)` over PBMC samples from
+    melanoma patients treated with miraclib. Models are fitted by the loader for each
+    database version; the API only reads them.
+
+    Returns:
+        List[MixedModelResult]: Fixed-effect estimates with FDR-adjusted p-values.
+    """
+    try:
+        return _cached_model_results()
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error fetching mixed model results: {str(e)}"
         )
 
 
+def _records_without_nan(df: pd.DataFrame) -> List[dict]:
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _cached_model_results() -> List[MixedModelResult]:
+    return _model_results_cache.get_or_compute(
+        inject.instance(DBConn).version,
+        "all",
+        lambda: [
+            MixedModelResult(**result)
+            for result in _records_without_nan(fetch_model_results())
+        ],
+    )
+
+
 @app.get(
     "/analysis_results/subset_analysis/{treatment}/{condition}/{time_from_treatment_start}/{sample_type}",
     response_model=SubsetAnalysisResult,
@@ -1,6 +1,17 @@
-from scipy.stats import false_discovery_control, mannwhitneyu, ttest_ind
+from concurrent.futures import ProcessPoolExecutor
+from scipy.stats import (
+    false_discovery_control,
+    mannwhitneyu,
+    norm,
+    ttest_1samp,
+    ttest_ind,
+    ttest_ind_from_stats,
+    wilcoxon,
+)
 
+import multiprocessing
 import numpy as np
+import os
 import pandas as pd
 
 
@@ -20,7 +31,7 @@ def apply_mannwhitney_test(df, value_col="percentage"):
     Apply Mann-Whitney U test to the DataFrame grouped by 'time_from_treatment_start' and 'population'.
     """
     results = (
-        df.groupby(["time_from_treatment_start", "population"])
+        df.groupby(["time_from_treatment_start", "population"], observed=True)
         .apply(lambda g: _mannwhitney_test(g, value_col), include_groups=False)
         .reset_index()
     )
@@ -50,7 +61,7 @@ def apply_t_test(df, value_col="percentage"):
     Apply two-sample t-test to the DataFrame grouped by 'time_from_treatment_start' and 'population'.
     """
     results = (
-        df.groupby(["time_from_treatment_start", "population"])
+        df.groupby(["time_from_treatment_start", "population"], observed=True)
         .apply(lambda g: _t_test(g, value_col), include_groups=False)
         .reset_index()
     )
@@ -62,3 +73,327 @@ def apply_t_test(df, value_col="percentage"):
     results["neg_log_fdr_adj_p_val"] = -np.log10(results.fdr_adj_p_val.fillna(1))
 
     return results
+
+
+def apply_paired_test(df, test="wilcoxon"):
+    """
+    Paired test of follow-up against baseline values per response group and population.
+
+    Expects one row per (subject, population) with 'baseline_value' and 'followup_value',
+    as returned by `fetch_paired_timepoints`. The differences of each response group are
+    pivoted into a subjects x populations matrix and every population is tested in one
+    vectorized scipy call: Wilcoxon signed-rank for 'wilcoxon', paired t-test for 't-test'.
+    """
+    df = df.assign(difference=df.followup_value - df.baseline_value)
+    summary = (
+        df.groupby(["response", "population"], observed=True)
+        .agg(
+            n_pairs=("difference", "count"),
+            baseline_mean=("baseline_value", "mean"),
+            followup_mean=("followup_value", "mean"),
+            mean_difference=("difference", "mean"),
+            median_difference=("difference", "median"),
+        )
+        .reset_index()
+    )
+
+    tests = []
+    for response, g in df.groupby("response", observed=True):
+        diffs = g.pivot(index="subject", columns="population", values="difference")
+        if test == "wilcoxon":
+            res = wilcoxon(diffs.to_numpy(), axis=0, nan_policy="omit")
+        elif test == "t-test":
+            res = ttest_1samp(diffs.to_numpy(), 0.0, axis=0, nan_policy="omit")
+        else:
+            raise ValueError(f"Unsupported paired test: {test}")
+        tests.append(
+            pd.DataFrame(
+                {
+                    "response": response,
+                    "population": diffs.columns.astype(str),
+                    "statistic": np.asarray(res.statistic, dtype=float),
+                    "raw_p_value": np.asarray(res.pvalue, dtype=float),
+                }
+            )
+        )
+
+    results = summary.astype({"response": str, "population": str}).merge(
+        pd.concat(tests, ignore_index=True) if tests else _empty_paired_tests(),
+        on=["response", "population"],
+        how="left",
+    )
+    valid = ~results.raw_p_value.isna()
+    results.loc[valid, "fdr_adj_p_val"] = false_discovery_control(
+        results.loc[valid, "raw_p_value"]
+    )
+    results["neg_log_fdr_adj_p_val"] = -np.log10(results.fdr_adj_p_val.fillna(1))
+
+    return results
+
+
+def _empty_paired_tests():
+    return pd.DataFrame(
+        columns=["response", "population", "statistic", "raw_p_value"]
+    ).astype({"statistic": float, "raw_p_value": float})
+
+
+def _median_difference_resampling(
+    r, nr, n_resamples, seed, batch_size, alpha, confidence_level
+):
+    """
+    Permutation p-value and bootstrap confidence interval for median(r) - median(nr),
+    with the number of permutations drawn and of bootstrap resamples.
+
+    Resamples are drawn in batches as index matrices (one row per resample) and reduced
+    with vectorized medians. Permutation stops early once the p-value is clearly above
+    `alpha`, i.e. the lower bound of its ~99.9% normal confidence interval exceeds it.
+    """
+    rng = np.random.default_rng(seed)
+    observed = np.median(r) - np.median(nr)
+    pooled = np.concatenate([r, nr])
+    n_r = len(r)
+
+    extreme = 0
+    done = 0
+    while done < n_resamples:
+        batch = min(batch_size, n_resamples - done)
+        perm = rng.permuted(np.tile(pooled, (batch, 1)), axis=1)
+        diffs = np.median(perm[:, :n_r], axis=1) - np.median(perm[:, n_r:], axis=1)
+        extreme += np.count_nonzero(np.abs(diffs) >= np.abs(observed))
+        done += batch
+        p_hat = (extreme + 1) / (done + 1)
+        if p_hat - 3.29 * np.sqrt(p_hat * (1 - p_hat) / done) > alpha:
+            break
+
+    boot = np.empty(n_resamples)
+    for start in range(0, n_resamples, batch_size):
+        batch = min(batch_size, n_resamples - start)
+        r_idx = rng.integers(0, n_r, size=(batch, n_r))
+        nr_idx = rng.integers(0, len(nr), size=(batch, len(nr)))
+        boot[start : start + batch] = np.median(r[r_idx], axis=1) - np.median(
+            nr[nr_idx], axis=1
+        )
+    tail = (1 - confidence_level) / 2 * 100
+    ci_low, ci_high = np.percentile(boot, [tail, 100 - tail])
+
+    return {
+        "raw_p_value": (extreme + 1) / (done + 1),
+        "median_difference": observed,
+        "median_difference_ci_low": ci_low,
+        "median_difference_ci_high": ci_high,
+        "n_permutations": done,
+        "n_bootstrap_resamples": n_resamples,
+    }
+
+
+def _permutation_task(task):
+    key, r, nr, kwargs = task
+    if len(r) < 1 or len(nr) < 1:
+        return key, {
+            "raw_p_value": np.nan,
+            "n_permutations": 0,
+            "n_bootstrap_resamples": 0,
+        }
+    return key, _median_difference_resampling(r, nr, **kwargs)
+
+
+def apply_permutation_test(
+    df,
+    value_col="percentage",
+    n_resamples=10000,
+    seed=0,
+    batch_size=1000,
+    alpha=0.05,
+    confidence_level=0.95,
+    max_workers=None,
+):
+    """
+    Apply a permutation test of the responder vs non-responder median difference, with a
+    bootstrap confidence interval, to the DataFrame grouped by 'time_from_treatment_start'
+    and 'population'.
+
+    Groups are spread across a ProcessPoolExecutor. Each group draws from its own child of
+    `np.random.SeedSequence(seed)`, so results do not depend on scheduling or on
+    `max_workers`.
+    """
+    groups = [
+        (key, g)
+        for key, g in df.groupby(
+            ["time_from_treatment_start", "population"], observed=True
+        )
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(groups))
+    tasks = [
+        (
+            key,
+            g.loc[g.response == "yes", value_col].dropna().to_numpy(dtype=float),
+            g.loc[g.response == "no", value_col].dropna().to_numpy(dtype=float),
+            {
+                "n_resamples": n_resamples,
+                "seed": child_seed,
+                "batch_size": batch_size,
+                "alpha": alpha,
+                "confidence_level": confidence_level,
+            },
+        )
+        for (key, g), child_seed in zip(groups, seeds)
+    ]
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if max_workers > 1:
+        # Spawned workers do not inherit the API's threads and open database handles
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            outcomes = list(pool.map(_permutation_task, tasks))
+    else:
+        outcomes = [_permutation_task(task) for task in tasks]
+
+    results = pd.DataFrame(
+        [
+            {"time_from_treatment_start": t, "population": p, **outcome}
+            for (t, p), outcome in outcomes
+        ],
+        columns=[
+            "time_from_treatment_start",
+            "population",
+            "raw_p_value",
+            "median_difference",
+            "median_difference_ci_low",
+            "median_difference_ci_high",
+            "n_permutations",
+            "n_bootstrap_resamples",
+        ],
+    )
+    valid = ~results.raw_p_value.isna()
+    results.loc[valid, "fdr_adj_p_val"] = false_discovery_control(
+        results.loc[valid, "raw_p_value"]
+    )
+    results["neg_log_fdr_adj_p_val"] = -np.log10(results.fdr_adj_p_val.fillna(1))
+
+    return results
+
+
+# Histogram grids of the streaming Mann-Whitney test, (low, high, bin width) per value
+# column. Percentages are stored rounded to 2 decimals, so their grid is exact; values
+# outside a grid are clipped into its edge bins.
+STREAMING_HISTOGRAM_GRIDS = {
+    "percentage": (0.0, 100.0, 0.01),
+    "clr": (-20.0, 20.0, 0.001),
+}
+
+
+class _StreamingGroupState:
+    """
+    Running state of one (time_from_treatment_start, population) group, per response:
+    Welford moments for the t-test and a value histogram on a fixed grid for the
+    Mann-Whitney test. Its size does not depend on the number of rows seen.
+    """
+
+    def __init__(self, n_bins):
+        self.count = {"yes": 0, "no": 0}
+        self.mean = {"yes": 0.0, "no": 0.0}
+        self.m2 = {"yes": 0.0, "no": 0.0}
+        self.histogram = {
+            "yes": np.zeros(n_bins, dtype=np.int64),
+            "no": np.zeros(n_bins, dtype=np.int64),
+        }
+
+    def update(self, response, values, bins):
+        # Chan et al. merge of the batch moments into the running ones
+        n_a, mean_a = self.count[response], self.mean[response]
+        n_b, mean_b = len(values), values.mean()
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        self.mean[response] = mean_a + delta * n_b / n
+        self.m2[response] += ((values - mean_b) ** 2).sum() + delta**2 * n_a * n_b / n
+        self.count[response] = n
+        self.histogram[response] += np.bincount(
+            bins, minlength=len(self.histogram[response])
+        )
+
+    def t_test_p_value(self):
+        n_r, n_nr = self.count["yes"], self.count["no"]
+        if n_r < 2 or n_nr < 2:
+            return np.nan
+        return ttest_ind_from_stats(
+            self.mean["yes"],
+            np.sqrt(self.m2["yes"] / (n_r - 1)),
+            n_r,
+            self.mean["no"],
+            np.sqrt(self.m2["no"] / (n_nr - 1)),
+            n_nr,
+            equal_var=False,
+        ).pvalue
+
+    def mannwhitney_p_value(self):
+        """
+        Two-sided asymptotic Mann-Whitney U test from the two histograms, with midranks
+        for values sharing a bin, tie-corrected variance and continuity correction (as
+        scipy's asymptotic method).
+        """
+        r, nr = self.histogram["yes"], self.histogram["no"]
+        n_r, n_nr = int(r.sum()), int(nr.sum())
+        if n_r < 1 or n_nr < 1:
+            return np.nan
+        nr_below = np.cumsum(nr) - nr
+        u = float(np.sum(r * nr_below) + 0.5 * np.sum(r * nr))
+        ties = (r + nr).astype(float)
+        n = n_r + n_nr
+        mu = n_r * n_nr / 2
+        sigma = np.sqrt(
+            n_r * n_nr / 12 * ((n + 1) - np.sum(ties**3 - ties) / (n * (n - 1)))
+        )
+        if sigma == 0:
+            return 1.0
+        z = (abs(u - mu) - 0.5) / sigma
+        return min(1.0, 2 * norm.sf(z))
+
+
+def _accumulate_streaming_states(batches, value_col):
+    low, high, width = STREAMING_HISTOGRAM_GRIDS[value_col]
+    n_bins = int(round((high - low) / width)) + 1
+    states = {}
+    for batch in batches:
+        df = batch.to_pandas()
+        df = df[df.response.isin(["yes", "no"]) & df[value_col].notna()]
+        for (time, population, response), g in df.groupby(
+            ["time_from_treatment_start", "population", "response"], observed=True
+        ):
+            values = g[value_col].to_numpy(dtype=float)
+            bins = np.clip(np.rint((values - low) / width), 0, n_bins - 1)
+            if (time, population) not in states:
+                states[time, population] = _StreamingGroupState(n_bins)
+            states[time, population].update(response, values, bins.astype(np.int64))
+    return states
+
+
+def apply_streaming_test(batches, test="mannwhitney", value_col="percentage"):
+    """
+    Out-of-core counterpart of `apply_mannwhitney_test` / `apply_t_test`.
+
+    Consumes an iterable of Arrow record batches with 'time_from_treatment_start',
+    'population', 'response' and `value_col`, keeping only per-group running state, so
+    peak memory is bounded by the batch size instead of the number of rows. The Welch
+    t-test is exact; Mann-Whitney is exact for values on the histogram grid (such as the
+    2-decimal percentages) and bins anything finer.
+    """
+    states = _accumulate_streaming_states(batches, value_col)
+    if test == "mannwhitney":
+        p_values = {key: state.mannwhitney_p_value() for key, state in states.items()}
+    elif test == "t-test":
+        p_values = {key: state.t_test_p_value() for key, state in states.items()}
+    else:
+        raise ValueError(f"Unsupported streaming test: {test}")
+
+    results = pd.DataFrame(
+        [(t, p, p_value) for (t, p), p_value in sorted(p_values.items())],
+        columns=["time_from_treatment_start", "population", "raw_p_value"],
+    )
+    valid = ~results.raw_p_value.isna()
+    results.loc[valid, "fdr_adj_p_val"] = false_discovery_control(
+        results.loc[valid, "raw_p_value"]
+    )
+    results["neg_log_fdr_adj_p_val"] = -np.log10(results.fdr_adj_p_val.fillna(1))
+
+    return results
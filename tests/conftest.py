@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The packages live under src/ and are run with PYTHONPATH=src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
@@ -0,0 +1,25 @@
+from rest.cache import VersionedCache
+
+
+def test_versioned_cache_evicts_least_recently_used():
+    cache = VersionedCache(max_entries=2)
+    computed = []
+
+    def compute(key):
+        computed.append(key)
+        return key
+
+    for key in ("a", "b", "a", "c", "a", "b"):
+        assert cache.get_or_compute("v1", key, lambda: compute(key)) == key
+
+    # "b" was evicted by "c", since "a" had been used more recently
+    assert computed == ["a", "b", "c", "b"]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_versioned_cache_drops_entries_of_other_versions():
+    cache = VersionedCache()
+    cache.get_or_compute("v1", "a", lambda: 1)
+
+    assert cache.get_or_compute("v2", "a", lambda: 2) == 2
+    assert cache.get_or_compute("v2", "a", lambda: 3) == 2
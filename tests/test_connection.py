@@ -0,0 +1,53 @@
+from db.connection import DuckDBConn, publish_database
+
+import duckdb
+import threading
+import time
+
+
+class _GatedDuckDBConn(DuckDBConn):
+    """
+    DuckDBConn whose engine builds wait for `gate`, standing in for the slow copies of
+    the in-memory and SQLite backends.
+    """
+
+    def __init__(self, database):
+        super().__init__(database, read_only=True)
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def _create_engine(self, target):
+        assert self.gate.wait(timeout=10)
+        return super()._create_engine(target)
+
+
+def _new_version(versions_dir, name):
+    path = str(versions_dir / name)
+    duckdb.connect(path).close()
+    return path
+
+
+def test_new_version_is_built_in_the_background(tmp_path):
+    versions_dir = tmp_path / "versions"
+    versions_dir.mkdir()
+    link_path = str(tmp_path / "cellanalysis.duckdb")
+    publish_database(_new_version(versions_dir, "v1.duckdb"), link_path)
+    conn = _GatedDuckDBConn(link_path)
+    with conn.pin_version() as version:
+        assert version == "v1.duckdb"
+
+    conn.gate.clear()
+    publish_database(_new_version(versions_dir, "v2.duckdb"), link_path)
+    # The build of v2 is blocked, yet requests are served from v1 without waiting
+    with conn.pin_version() as version:
+        assert version == "v1.duckdb"
+
+    conn.gate.set()
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        with conn.pin_version() as version:
+            if version == "v2.duckdb":
+                break
+        time.sleep(0.01)
+    assert version == "v2.duckdb"
+    conn.close()
@@ -0,0 +1,87 @@
+"""
+crud queries against a small database built with the loader's own SQL files, so the
+columns have the ENUM types of a real load.
+"""
+
+from db import crud
+from db.connection import DuckDBConn
+from db.constant import TableNames
+
+import duckdb
+import os
+import pytest
+
+SQL_DIR = os.path.join(os.path.dirname(__file__), "..", "data_model", "sql")
+SQL_FILES = [
+    "model/staging_schema.sql",
+    "load/load_staging_data.sql",
+    "model/analysis_schema.sql",
+    "load/load_analysis_data.sql",
+]
+
+CELL_COUNT_CSV = """\
+project,subject,condition,age,sex,treatment,response,sample,sample_type,time_from_treatment_start,b_cell,cd8_t_cell,cd4_t_cell,nk_cell,monocyte
+prj1,sbj1,melanoma,57,M,miraclib,no,s1,PBMC,0,1,2,3,4,5
+prj1,sbj2,melanoma,61,F,miraclib,yes,s2,PBMC,0,5,4,3,2,1
+prj2,sbj3,melanoma,45,F,miraclib,yes,s3,PBMC,0,2,2,2,2,2
+prj2,sbj3,melanoma,45,F,miraclib,yes,s4,PBMC,7,3,3,3,3,3
+prj2,sbj4,carcinoma,70,M,phauximab,no,s0,WB,0,1,1,1,1,1
+"""
+
+
+@pytest.fixture
+def conn(tmp_path):
+    csv_path = tmp_path / "cell_count.csv"
+    csv_path.write_text(CELL_COUNT_CSV)
+    database = str(tmp_path / "cellanalysis.duckdb")
+    with duckdb.connect(database) as build:
+        for sql_file in SQL_FILES:
+            with open(os.path.join(SQL_DIR, sql_file)) as f:
+                build.execute(f.read().replace("@csv_path@", str(csv_path)))
+
+    conn = DuckDBConn(database, read_only=True)
+    yield conn
+    conn.close()
+
+
+def test_reflected_enum_columns_are_labels(conn):
+    # sample references subject; reflecting sample first must not reflect subject
+    # along without the ENUM listener
+    _, (sample, subject) = crud._reflect_tables(
+        conn, TableNames.SAMPLE, TableNames.SUBJECT
+    )
+
+    assert isinstance(sample.c.sample_type.type, crud._EnumLabel)
+    for column in ("condition", "sex", "treatment", "response"):
+        assert isinstance(subject.c[column].type, crud._EnumLabel)
+
+
+def test_live_subset_analysis_on_enum_columns(conn):
+    result = crud._live_subset_analysis(
+        conn,
+        treatment="miraclib",
+        condition="melanoma",
+        sample_type="PBMC",
+        time_from_treatment_start=0,
+    )
+
+    assert sorted(result["samples_per_project"], key=lambda r: r["project"]) == [
+        {"project": "prj1", "sample_count": 2},
+        {"project": "prj2", "sample_count": 1},
+    ]
+    assert sorted(result["subjects_by_response"], key=lambda r: r["response"]) == [
+        {"response": "no", "subject_count": 1},
+        {"response": "yes", "subject_count": 2},
+    ]
+    assert sorted(result["subjects_by_sex"], key=lambda r: r["sex"]) == [
+        {"sex": "F", "subject_count": 2},
+        {"sex": "M", "subject_count": 1},
+    ]
+
+
+def test_relative_cell_frequency_is_ordered_for_pagination(conn):
+    df = crud.fetch_relative_cell_frequency(conn=conn)
+
+    keys = list(zip(df["sample"], df["population"].astype(str)))
+    assert len(keys) == 5 * 5
+    assert keys == sorted(keys)
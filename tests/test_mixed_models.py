@@ -0,0 +1,62 @@
+from mixed_models import fit_population_models, MODEL_TERMS
+
+import numpy as np
+import pandas as pd
+import pytest
+
+POPULATIONS = ["b_cell", "cd4_t_cell", "nk_cell"]
+
+
+def _model_input(timepoints=(0, 7, 14), sexes=("M", "F"), n_subjects=12, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n_subjects):
+        subject_effect = rng.normal(0, 2)
+        for time in timepoints:
+            for population in POPULATIONS:
+                rows.append(
+                    {
+                        "subject": f"sbj{i}",
+                        "population": population,
+                        "response": "yes" if i % 2 else "no",
+                        "time_from_treatment_start": time,
+                        "age": 40 + 3 * i,
+                        "sex": sexes[i // 2 % len(sexes)],
+                        "percentage": 20 + subject_effect + rng.normal(0, 1),
+                    }
+                )
+    return pd.DataFrame(rows)
+
+
+def _terms_without_estimate(results):
+    return set(results.loc[results.estimate.isna(), "term"])
+
+
+def test_full_rank_design_estimates_every_term():
+    results = fit_population_models(_model_input(), max_workers=1)
+
+    assert len(results) == len(POPULATIONS) * len(MODEL_TERMS)
+    assert not results[["estimate", "std_error", "fdr_adj_p_val"]].isna().any().any()
+
+
+@pytest.mark.parametrize("time", [0, 7])
+def test_single_timepoint_leaves_time_terms_unestimated(time):
+    results = fit_population_models(_model_input(timepoints=(time,)), max_workers=1)
+
+    unestimated = {
+        "time_from_treatment_start",
+        "response_yes:time_from_treatment_start",
+    }
+    assert _terms_without_estimate(results) == unestimated
+    estimated = results[~results.term.isin(unestimated)]
+    assert estimated.fdr_adj_p_val.between(0, 1).all()
+    assert results[results.term.isin(unestimated)].fdr_adj_p_val.isna().all()
+
+
+def test_single_sex_leaves_sex_unestimated():
+    results = fit_population_models(_model_input(sexes=("F",)), max_workers=1)
+
+    assert _terms_without_estimate(results) == {"sex_M"}
+    intercept = results[results.term == "intercept"]
+    assert intercept.estimate.notna().all()
+    assert intercept.fdr_adj_p_val.between(0, 1).all()
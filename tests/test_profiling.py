@@ -0,0 +1,40 @@
+from db.profiling import SlowQueryLog, tag_queries
+from sqlalchemy import create_engine, MetaData, Table
+
+import pytest
+import sqlalchemy.exc
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("duckdb:///:memory:")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE cells (sample TEXT, count INTEGER)")
+    yield engine
+    engine.dispose()
+
+
+def test_reflection_statements_are_not_recorded(engine):
+    slow_queries = SlowQueryLog(threshold_ms=0)
+    slow_queries.attach(engine)
+
+    with tag_queries("fetch_cells"):
+        cells = Table("cells", MetaData(), autoload_with=engine)
+        with engine.connect() as conn:
+            conn.execute(cells.select()).fetchall()
+
+    shapes = [s["shape"] for s in slow_queries.top(100)]
+    assert len(shapes) == 1
+    assert "FROM cells" in shapes[0]
+
+
+def test_failed_statement_leaves_no_start_time_behind(engine):
+    slow_queries = SlowQueryLog(threshold_ms=0)
+    slow_queries.attach(engine)
+
+    with engine.connect() as conn:
+        with pytest.raises(sqlalchemy.exc.DBAPIError):
+            conn.exec_driver_sql("SELECT * FROM missing_table")
+        assert conn.info["query_start"] == []
+        conn.exec_driver_sql("SELECT 1").fetchall()
+        assert conn.info["query_start"] == []
@@ -0,0 +1,38 @@
+from rest.result_store import ArrowResultStore
+
+import os
+import pyarrow as pa
+
+
+def _table(value):
+    return pa.table({"value": [value]})
+
+
+def test_result_store_prunes_all_but_the_previous_version(tmp_path):
+    store = ArrowResultStore(str(tmp_path))
+    for version in ("v1", "v2", "v3"):
+        store.get_or_compute(version, "result", {"a": 1}, lambda: _table(version))
+
+    # Requests still pinned to v2 may be reading or writing its results
+    assert sorted(os.listdir(tmp_path)) == ["v2", "v3"]
+
+
+def test_result_store_stops_storing_beyond_max_entries(tmp_path):
+    store = ArrowResultStore(str(tmp_path), max_entries=2)
+    for value in range(3):
+        table = store.get_or_compute(
+            "v1", "result", {"a": value}, lambda: _table(value)
+        )
+        assert table.column("value").to_pylist() == [value]
+
+    assert len(list((tmp_path / "v1" / "result").glob("*.arrow"))) == 2
+
+
+def test_result_store_does_not_serve_results_of_other_code(tmp_path):
+    old_code = ArrowResultStore(str(tmp_path), code_version="old")
+    old_code.get_or_compute("v1", "result", {"a": 1}, lambda: _table("old"))
+
+    new_code = ArrowResultStore(str(tmp_path), code_version="new")
+    table = new_code.get_or_compute("v1", "result", {"a": 1}, lambda: _table("new"))
+
+    assert table.column("value").to_pylist() == ["new"]
@@ -0,0 +1,208 @@
+"""
+Statistics of stat_tests against scipy on small fixed inputs.
+"""
+
+from scipy.stats import mannwhitneyu, permutation_test, ttest_1samp, ttest_ind, wilcoxon
+from stat_tests import apply_paired_test, apply_permutation_test, apply_streaming_test
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+
+def _group_input(seed=0):
+    """
+    Two timepoints x two populations, responders shifted up in 'b_cell' only, with
+    percentages rounded to 2 decimals like the loaded data.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for time in (0, 7):
+        for population, shift in (("b_cell", 10.0), ("nk_cell", 0.0)):
+            for response in ("yes", "no"):
+                values = rng.normal(30 + (shift if response == "yes" else 0), 3, 8)
+                rows.extend(
+                    {
+                        "time_from_treatment_start": time,
+                        "population": population,
+                        "response": response,
+                        "percentage": round(float(v), 2),
+                    }
+                    for v in values
+                )
+    return pd.DataFrame(rows)
+
+
+def _by_group(results):
+    return results.set_index(["time_from_treatment_start", "population"]).sort_index()
+
+
+def test_permutation_test_is_reproducible_for_a_seed():
+    df = _group_input()
+    kwargs = {"n_resamples": 2000, "seed": 42, "batch_size": 500}
+
+    first = apply_permutation_test(df, max_workers=1, **kwargs)
+    again = apply_permutation_test(df, max_workers=1, **kwargs)
+    parallel = apply_permutation_test(df, max_workers=2, **kwargs)
+
+    pd.testing.assert_frame_equal(_by_group(first), _by_group(again))
+    pd.testing.assert_frame_equal(_by_group(first), _by_group(parallel))
+
+
+def test_permutation_test_matches_scipy_permutation_test():
+    df = _group_input()
+    results = _by_group(
+        apply_permutation_test(df, n_resamples=5000, seed=1, max_workers=1)
+    )
+
+    for (time, population), g in df.groupby(
+        ["time_from_treatment_start", "population"]
+    ):
+        r = g.loc[g.response == "yes", "percentage"].to_numpy()
+        nr = g.loc[g.response == "no", "percentage"].to_numpy()
+        expected = permutation_test(
+            (r, nr),
+            lambda x, y, axis: np.median(x, axis=axis) - np.median(y, axis=axis),
+            permutation_type="independent",
+            n_resamples=5000,
+            vectorized=True,
+            rng=np.random.default_rng(1),
+        )
+        row = results.loc[(time, population)]
+        assert row.median_difference == pytest.approx(expected.statistic)
+        assert row.raw_p_value == pytest.approx(expected.pvalue, abs=0.03)
+        assert row.median_difference_ci_low < row.median_difference
+        assert row.median_difference < row.median_difference_ci_high
+
+
+def test_permutation_test_reports_permutation_and_bootstrap_counts():
+    results = _by_group(
+        apply_permutation_test(_group_input(), n_resamples=4000, seed=0, max_workers=1)
+    )
+
+    # A clear difference draws every permutation, a null one may stop early
+    shifted = results.xs("b_cell", level="population")
+    null = results.xs("nk_cell", level="population")
+    assert (shifted.raw_p_value < 0.01).all()
+    assert (shifted.n_permutations == 4000).all()
+    assert (null.n_permutations <= 4000).all()
+    assert (results.n_bootstrap_resamples == 4000).all()
+
+
+def test_permutation_test_skips_a_group_without_both_responses():
+    df = _group_input()
+    df = df[~((df.population == "nk_cell") & (df.response == "no"))]
+    results = _by_group(apply_permutation_test(df, n_resamples=500, max_workers=1))
+
+    missing = results.xs("nk_cell", level="population")
+    assert missing.raw_p_value.isna().all()
+    assert (missing.n_permutations == 0).all()
+    assert (missing.n_bootstrap_resamples == 0).all()
+    assert results.xs("b_cell", level="population").fdr_adj_p_val.notna().all()
+
+
+def _record_batches(df, batch_size):
+    return pa.Table.from_pandas(df, preserve_index=False).to_batches(batch_size)
+
+
+def _responder_values(df, value_col="percentage"):
+    for (time, population), g in df.groupby(
+        ["time_from_treatment_start", "population"]
+    ):
+        r = g.loc[g.response == "yes", value_col]
+        nr = g.loc[g.response == "no", value_col]
+        yield (time, population), r, nr
+
+
+@pytest.mark.parametrize("batch_size", [5, 64])
+def test_streaming_mannwhitney_matches_scipy_on_tied_values(batch_size):
+    # Integer-rounded values share histogram bins, exercising the midranks and the
+    # tie correction
+    df = _group_input().assign(percentage=lambda d: d.percentage.round())
+    results = _by_group(
+        apply_streaming_test(_record_batches(df, batch_size), test="mannwhitney")
+    )
+
+    for key, r, nr in _responder_values(df):
+        expected = mannwhitneyu(r, nr, method="asymptotic").pvalue
+        assert results.loc[key].raw_p_value == pytest.approx(expected, rel=1e-9)
+
+
+@pytest.mark.parametrize("batch_size", [5, 64])
+def test_streaming_t_test_matches_scipy_welch_t_test(batch_size):
+    df = _group_input()
+    results = _by_group(
+        apply_streaming_test(_record_batches(df, batch_size), test="t-test")
+    )
+
+    for key, r, nr in _responder_values(df):
+        expected = ttest_ind(r, nr, equal_var=False).pvalue
+        assert results.loc[key].raw_p_value == pytest.approx(expected, rel=1e-9)
+
+
+def test_streaming_test_skips_rows_without_a_response_or_value():
+    df = _group_input()
+    noise = df.head(4).assign(response=["unknown", None, "yes", "no"])
+    noise.loc[noise.response.isin(["yes", "no"]), "percentage"] = np.nan
+    results = _by_group(
+        apply_streaming_test(
+            _record_batches(pd.concat([df, noise]), 7), test="mannwhitney"
+        )
+    )
+
+    for key, r, nr in _responder_values(df):
+        expected = mannwhitneyu(r, nr, method="asymptotic").pvalue
+        assert results.loc[key].raw_p_value == pytest.approx(expected, rel=1e-9)
+
+
+def test_streaming_test_rejects_an_unknown_test():
+    with pytest.raises(ValueError, match="Unsupported streaming test"):
+        apply_streaming_test(_record_batches(_group_input(), 64), test="anova")
+
+
+def _paired_input(seed=0, n_subjects=9):
+    """
+    Baseline and follow-up percentages per (subject, population) like
+    `fetch_paired_timepoints`, with one responder missing a 'nk_cell' pair.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n_subjects):
+        response = "yes" if i % 2 else "no"
+        for population, change in (("b_cell", 4.0), ("nk_cell", 0.0)):
+            if i == 1 and population == "nk_cell":
+                continue
+            baseline = rng.normal(30, 3)
+            rows.append(
+                {
+                    "subject": f"sbj{i}",
+                    "response": response,
+                    "population": population,
+                    "baseline_value": round(baseline, 2),
+                    "followup_value": round(baseline + change + rng.normal(0, 2), 2),
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize(
+    "test, scipy_test",
+    [("wilcoxon", wilcoxon), ("t-test", lambda d: ttest_1samp(d, 0.0))],
+)
+def test_paired_test_matches_scipy_per_response_and_population(test, scipy_test):
+    df = _paired_input()
+    results = apply_paired_test(df, test=test).set_index(["response", "population"])
+
+    for (response, population), g in df.groupby(["response", "population"]):
+        expected = scipy_test(g.followup_value - g.baseline_value)
+        row = results.loc[(response, population)]
+        assert row.n_pairs == len(g)
+        assert row.statistic == pytest.approx(expected.statistic, rel=1e-9)
+        assert row.raw_p_value == pytest.approx(expected.pvalue, rel=1e-9)
+    assert results.fdr_adj_p_val.notna().all()
+
+
+def test_paired_test_rejects_an_unknown_test():
+    with pytest.raises(ValueError, match="Unsupported paired test"):
+        apply_paired_test(_paired_input(), test="sign")